@@ -1,45 +1,110 @@
-import streamlit as st
-from inference_calculator import calculate
-import plotly.graph_objects as go
-
-st.set_page_config(page_title="LLM Inference Calculator", layout="centered")
-
-st.title("🤖 LLM Inference Cost & Performance Calculator")
-st.write("Estimate latency, memory usage, and cost per request for large language models across various hardware types.")
-
-# Sidebar Inputs
-st.sidebar.header("🧠 Model & Inference Settings")
-model_size = st.sidebar.number_input("Model Size (in B)", min_value=1.0, value=7.0, step=1.0)
-tokens = st.sidebar.slider("Input Tokens", 1, 2048, 256)
-batch_size = st.sidebar.slider("Batch Size", 1, 32, 1)
-hardware_type = st.sidebar.selectbox("Hardware", ["cpu", "gpu", "a100", "tpu"])
-deployment_mode = st.sidebar.selectbox("Deployment Mode", ["local", "api"])
-
-# Run Calculator
-if st.sidebar.button("🧮 Calculate"):
-    result = calculate(model_size_b=model_size, tokens=tokens, batch_size=batch_size,
-                       hardware_type=hardware_type, deployment_mode=deployment_mode)
-
-    st.subheader("📊 Results")
-    st.success("✅ Hardware Compatible" if result["Hardware Compatible"] else "❌ Not Compatible")
-
-    st.metric("🕒 Latency (ms)", result["Latency (ms)"])
-    st.metric("💾 Memory Usage (GB)", result["Memory Usage (GB)"])
-    st.metric("💸 Cost per Request ($)", result["Cost per request ($)"])
-
-    # Visualization
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=result["Latency (ms)"],
-        title={"text": "Latency (ms)"},
-        domain={'x': [0, 1], 'y': [0, 1]},
-        gauge={'axis': {'range': [0, 200]},
-               'bar': {'color': "royalblue"},
-               'steps': [
-                   {'range': [0, 60], 'color': 'lightgreen'},
-                   {'range': [60, 120], 'color': 'orange'},
-                   {'range': [120, 200], 'color': 'red'}]}
-    ))
-    st.plotly_chart(fig)
-
-    st.markdown("🧮 Tip: Lower model sizes and token counts reduce latency & cost.")
+import streamlit as st
+from inference_calculator import calculate, compare_serving, plan_sharding, simulate, HARDWARE_NOISE, DEFAULT_HARDWARE_NOISE
+import plotly.graph_objects as go
+
+st.set_page_config(page_title="LLM Inference Calculator", layout="centered")
+
+st.title("🤖 LLM Inference Cost & Performance Calculator")
+st.write("Estimate latency, memory usage, and cost per request for large language models across various hardware types.")
+
+# Sidebar Inputs
+st.sidebar.header("🧠 Model & Inference Settings")
+model_size = st.sidebar.number_input("Model Size (in B)", min_value=1.0, value=7.0, step=1.0)
+tokens = st.sidebar.slider("Input Tokens", 1, 2048, 256)
+batch_size = st.sidebar.slider("Batch Size", 1, 32, 1)
+hardware_type = st.sidebar.selectbox("Hardware", ["cpu", "gpu", "a100", "tpu"])
+deployment_mode = st.sidebar.selectbox("Deployment Mode", ["local", "api"])
+max_devices = st.sidebar.slider("Max Devices (sharding)", 2, 128, 64)
+
+st.sidebar.header("⚙️ Serving Strategy")
+output_tokens = st.sidebar.slider("Output Tokens (mean)", 1, 2048, 256)
+output_spread = st.sidebar.slider("Output length spread (σ)", 0.0, 1.5, 0.8, 0.1)
+use_speculative = st.sidebar.checkbox("Speculative decoding")
+if use_speculative:
+    draft_size = st.sidebar.number_input("Draft Model Size (in B)", min_value=0.1, value=1.0, step=0.5)
+    acceptance_rate = st.sidebar.slider("Draft acceptance rate", 0.0, 0.95, 0.7, 0.05)
+
+st.sidebar.header("📈 Uncertainty")
+show_uncertainty = st.sidebar.checkbox("Show percentile bands (Monte Carlo)")
+if show_uncertainty:
+    token_spread = st.sidebar.slider("Token length spread (σ)", 0.0, 1.0, 0.3, 0.05)
+    batch_range = st.sidebar.slider("Batch size range", 1, 32, (batch_size, batch_size))
+    hardware_noise = st.sidebar.slider("Hardware noise (σ)", 0.0, 0.5,
+                                       HARDWARE_NOISE.get(hardware_type, DEFAULT_HARDWARE_NOISE), 0.05)
+    samples = st.sidebar.select_slider("Samples", [10_000, 100_000, 1_000_000], 100_000)
+
+# Run Calculator
+if st.sidebar.button("🧮 Calculate"):
+    result = calculate(model_size_b=model_size, tokens=tokens, batch_size=batch_size,
+                       hardware_type=hardware_type, deployment_mode=deployment_mode)
+
+    st.subheader("📊 Results")
+    st.success("✅ Hardware Compatible" if result["Hardware Compatible"] else "❌ Not Compatible")
+
+    if not result["Hardware Compatible"]:
+        plans = plan_sharding(model_size_b=model_size, tokens=tokens, batch_size=batch_size,
+                              hardware_type=hardware_type, max_devices=max_devices)
+        st.subheader("🧩 Sharding Plan")
+        if plans:
+            st.info(f"Fits on {min(plan['Devices'] for plan in plans)} × {hardware_type} "
+                    "with tensor/pipeline parallelism. Configurations, cheapest first:")
+            st.dataframe(plans, hide_index=True)
+        else:
+            st.error(f"Does not fit on {max_devices} × {hardware_type}.")
+
+    st.metric("🕒 Latency (ms)", result["Latency (ms)"])
+    st.metric("💾 Memory Usage (GB)", result["Memory Usage (GB)"])
+    st.metric("💸 Cost per Request ($)", result["Cost per request ($)"])
+
+    # Visualization
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=result["Latency (ms)"],
+        title={"text": "Latency (ms)"},
+        domain={'x': [0, 1], 'y': [0, 1]},
+        gauge={'axis': {'range': [0, 200]},
+               'bar': {'color': "royalblue"},
+               'steps': [
+                   {'range': [0, 60], 'color': 'lightgreen'},
+                   {'range': [60, 120], 'color': 'orange'},
+                   {'range': [120, 200], 'color': 'red'}]}
+    ))
+    st.plotly_chart(fig)
+
+    serving = compare_serving(model_size_b=model_size, batch_size=range(1, 33),
+                              output_tokens=("lognormal", output_tokens, output_spread) if output_spread else output_tokens,
+                              prompt_tokens=tokens, draft_size_b=draft_size if use_speculative else None,
+                              acceptance_rate=acceptance_rate if use_speculative else 0.0, seed=0)
+    strategies = [label for label in serving if label.endswith("(tokens/s)")]
+
+    st.subheader("⚙️ Serving Strategies")
+    row = batch_size - 1
+    columns = st.columns(len(strategies))
+    for column, label in zip(columns, strategies):
+        speedup = serving[label][row] / serving["Static Batching (tokens/s)"][row]
+        column.metric(label.replace(" (tokens/s)", ""), f"{serving[label][row]:,.0f} tok/s", f"{speedup:.2f}× static")
+    if use_speculative:
+        st.caption(f"Speculative decoding drafts {serving['Draft Tokens'][row]} tokens per round at batch size {batch_size}.")
+
+    serving_fig = go.Figure([go.Scatter(x=serving["Batch Size"], y=serving[label], mode="lines", name=label.replace(" (tokens/s)", ""))
+                             for label in strategies])
+    serving_fig.update_layout(title="Decode throughput by batch size", xaxis_title="Batch Size", yaxis_title="Tokens/s")
+    st.plotly_chart(serving_fig)
+
+    if show_uncertainty:
+        bands = simulate(model_size_b=model_size,
+                         tokens=("lognormal", tokens, token_spread) if token_spread else tokens,
+                         batch_size=("integers", *batch_range), hardware_type=hardware_type,
+                         samples=samples, hardware_noise=hardware_noise)
+
+        st.subheader("📈 Uncertainty")
+        st.table({label: bands[label] for label in ["Latency (ms)", "Memory Usage (GB)", "Cost per request ($)"]})
+        st.metric("⚠️ Chance of exceeding memory limit", f"{bands['Memory Limit Exceeded (probability)']:.1%}")
+
+        band_fig = go.Figure(go.Bar(x=list(bands["Latency (ms)"]), y=list(bands["Latency (ms)"].values()),
+                                    marker_color=["royalblue", "orange", "red"]))
+        band_fig.add_hline(y=result["Latency (ms)"], line_dash="dash", annotation_text="point estimate")
+        band_fig.update_layout(title=f"Latency percentiles over {samples:,} samples", yaxis_title="Latency (ms)")
+        st.plotly_chart(band_fig)
+
+    st.markdown("🧮 Tip: Lower model sizes and token counts reduce latency & cost.")
@@ -1,49 +1,374 @@
-def estimate_latency(model_size_b, tokens, batch_size, hardware_type):
-    base_latency = {
-        "cpu": 15,
-        "gpu": 5,
-        "a100": 2,
-        "tpu": 2
-    }
-
-    latency = base_latency.get(hardware_type.lower(), 10)
-    latency += (model_size_b / 7) * 1.5  # Heavier models → more latency
-    latency += (batch_size * tokens) / 1000  # Basic estimate
-    return round(latency, 2)
-
-def estimate_memory_usage(model_size_b, batch_size):
-    return round(model_size_b * 2 + batch_size * 0.5, 2)  # in GB
-
-def estimate_cost(model_size_b, tokens, hardware_type):
-    cost_per_sec = {
-        "cpu": 0.001,
-        "gpu": 0.01,
-        "a100": 0.12,
-        "tpu": 0.10
-    }
-
-    latency = estimate_latency(model_size_b, tokens, 1, hardware_type)
-    cost = latency * cost_per_sec.get(hardware_type.lower(), 0.02)
-    return round(cost, 4)
-
-def is_compatible(memory_usage, hardware_type):
-    limits = {
-        "cpu": 32,
-        "gpu": 24,
-        "a100": 80,
-        "tpu": 64
-    }
-    return memory_usage <= limits.get(hardware_type.lower(), 16)
-
-def calculate(model_size_b, tokens, batch_size, hardware_type, deployment_mode="local"):
-    latency = estimate_latency(model_size_b, tokens, batch_size, hardware_type)
-    memory = estimate_memory_usage(model_size_b, batch_size)
-    cost = estimate_cost(model_size_b, tokens, hardware_type)
-    compatible = is_compatible(memory, hardware_type)
-
-    return {
-        "Latency (ms)": latency,
-        "Memory Usage (GB)": memory,
-        "Cost per request ($)": cost,
-        "Hardware Compatible": compatible
-    }
+import math
+
+import numpy as np
+
+BASE_LATENCY = {
+    "cpu": 15,
+    "gpu": 5,
+    "a100": 2,
+    "tpu": 2
+}
+DEFAULT_BASE_LATENCY = 10
+
+COST_PER_SEC = {
+    "cpu": 0.001,
+    "gpu": 0.01,
+    "a100": 0.12,
+    "tpu": 0.10
+}
+DEFAULT_COST_PER_SEC = 0.02
+
+MEMORY_LIMITS = {
+    "cpu": 32,
+    "gpu": 24,
+    "a100": 80,
+    "tpu": 64
+}
+DEFAULT_MEMORY_LIMIT = 16
+
+# Run-to-run spread of each hardware's latency under real load (sigma of a
+# lognormal factor with median 1), used by simulate()
+HARDWARE_NOISE = {
+    "cpu": 0.25,
+    "gpu": 0.15,
+    "a100": 0.10,
+    "tpu": 0.10
+}
+DEFAULT_HARDWARE_NOISE = 0.20
+
+PERCENTILES = (50, 90, 99)
+
+# Inter-device links used by plan_sharding(): per-message latency (ms) and bandwidth (GB/s)
+COMM_LATENCY_MS = {
+    "cpu": 0.2,
+    "gpu": 0.05,
+    "a100": 0.01,
+    "tpu": 0.01
+}
+DEFAULT_COMM_LATENCY_MS = 0.1
+
+INTERCONNECT_GB_PER_S = {
+    "cpu": 10,
+    "gpu": 32,
+    "a100": 300,
+    "tpu": 100
+}
+DEFAULT_INTERCONNECT_GB_PER_S = 16
+
+# Runtime and communication buffers on each device of a sharded model
+SHARDING_OVERHEAD_GB = 1.0
+
+def estimate_latency(model_size_b, tokens, batch_size, hardware_type):
+    latency = BASE_LATENCY.get(hardware_type.lower(), DEFAULT_BASE_LATENCY)
+    latency += (model_size_b / 7) * 1.5  # Heavier models → more latency
+    latency += (batch_size * tokens) / 1000  # Basic estimate
+    return round(latency, 2)
+
+def estimate_memory_usage(model_size_b, batch_size):
+    return round(model_size_b * 2 + batch_size * 0.5, 2)  # in GB
+
+def estimate_cost(model_size_b, tokens, hardware_type):
+    latency = estimate_latency(model_size_b, tokens, 1, hardware_type)
+    cost = latency * COST_PER_SEC.get(hardware_type.lower(), DEFAULT_COST_PER_SEC)
+    return round(cost, 4)
+
+def is_compatible(memory_usage, hardware_type):
+    return memory_usage <= MEMORY_LIMITS.get(hardware_type.lower(), DEFAULT_MEMORY_LIMIT)
+
+def calculate(model_size_b, tokens, batch_size, hardware_type, deployment_mode="local"):
+    latency = estimate_latency(model_size_b, tokens, batch_size, hardware_type)
+    memory = estimate_memory_usage(model_size_b, batch_size)
+    cost = estimate_cost(model_size_b, tokens, hardware_type)
+    compatible = is_compatible(memory, hardware_type)
+
+    return {
+        "Latency (ms)": latency,
+        "Memory Usage (GB)": memory,
+        "Cost per request ($)": cost,
+        "Hardware Compatible": compatible
+    }
+
+def sample_distribution(spec, size, rng):
+    """
+    Draw size values from spec: a number (always that value) or one of
+    ("lognormal", median, sigma), ("normal", mean, std), ("uniform", low, high),
+    ("integers", low, high) (both inclusive), ("poisson", mean) or
+    ("choice", values) / ("choice", values, weights).
+    """
+    if np.isscalar(spec):
+        return np.full(size, float(spec))
+    kind, *params = spec
+    if kind == "lognormal":
+        median, sigma = params
+        return rng.lognormal(np.log(median), sigma, size)
+    if kind == "normal":
+        return rng.normal(params[0], params[1], size)
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1], size)
+    if kind == "integers":
+        return rng.integers(params[0], params[1], size, endpoint=True).astype(float)
+    if kind == "poisson":
+        return rng.poisson(params[0], size).astype(float)
+    if kind == "choice":
+        values = np.asarray(params[0], dtype=float)
+        weights = None
+        if len(params) > 1:
+            weights = np.asarray(params[1], dtype=float)
+            weights = weights / weights.sum()
+        return rng.choice(values, size, p=weights)
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+def _percentiles(values, digits):
+    return {f"p{p}": round(float(v), digits) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+def simulate(model_size_b, tokens, batch_size, hardware_type, samples=100_000, hardware_noise=None, seed=None):
+    """
+    Monte Carlo version of calculate(). tokens and batch_size are numbers or
+    distributions (see sample_distribution), rounded to whole values of at
+    least 1. Each sample's latency is also scaled by a lognormal factor with
+    median 1 and sigma hardware_noise (default: HARDWARE_NOISE for the
+    hardware), which carries over to its cost. All samples are computed in
+    one vectorized pass; 1M samples take about 0.1 s.
+
+    Returns p50/p90/p99 of latency, memory and cost, and the fraction of
+    samples whose memory exceeds the hardware's limit.
+    """
+    hardware = hardware_type.lower()
+    rng = np.random.default_rng(seed)
+    tokens = np.maximum(np.rint(sample_distribution(tokens, samples, rng)), 1)
+    batch = np.maximum(np.rint(sample_distribution(batch_size, samples, rng)), 1)
+    if hardware_noise is None:
+        hardware_noise = HARDWARE_NOISE.get(hardware, DEFAULT_HARDWARE_NOISE)
+    noise = rng.lognormal(0.0, hardware_noise, samples) if hardware_noise else 1.0
+
+    # Same terms as estimate_latency; cost uses the batch-of-one latency like estimate_cost
+    fixed = BASE_LATENCY.get(hardware, DEFAULT_BASE_LATENCY) + (model_size_b / 7) * 1.5
+    latency = (fixed + batch * tokens / 1000) * noise
+    cost = (fixed + tokens / 1000) * noise * COST_PER_SEC.get(hardware, DEFAULT_COST_PER_SEC)
+    memory = model_size_b * 2 + batch * 0.5
+    exceeded = np.count_nonzero(memory > MEMORY_LIMITS.get(hardware, DEFAULT_MEMORY_LIMIT)) / samples
+
+    return {
+        "Samples": samples,
+        "Latency (ms)": _percentiles(latency, 2),
+        "Memory Usage (GB)": _percentiles(memory, 2),
+        "Cost per request ($)": _percentiles(cost, 4),
+        "Memory Limit Exceeded (probability)": round(float(exceeded), 4)
+    }
+
+def estimate_model_shape(model_size_b):
+    """Approximate (layers, hidden size) of a dense transformer, from parameters ≈ 12 · layers · hidden²."""
+    hidden = max(128, round(4096 * (model_size_b / 7) ** (1 / 3) / 128) * 128)
+    layers = max(1, round(model_size_b * 1e9 / (12 * hidden ** 2)))
+    return layers, hidden
+
+def sharded_memory_usage(model_size_b, batch_size, devices):
+    # Weights and KV cache split evenly across tensor and pipeline shards
+    memory = estimate_memory_usage(model_size_b, batch_size) / devices
+    if devices > 1:
+        memory += SHARDING_OVERHEAD_GB
+    return round(memory, 2)
+
+def estimate_communication(model_size_b, tokens, batch_size, hardware_type, tensor_parallel, pipeline_parallel):
+    """
+    Latency (ms) added by sharding: two ring all-reduces of the activations
+    per layer across the tensor-parallel group, and one hop of the
+    activations between each pair of pipeline stages.
+    """
+    hardware = hardware_type.lower()
+    message_ms = COMM_LATENCY_MS.get(hardware, DEFAULT_COMM_LATENCY_MS)
+    bandwidth = INTERCONNECT_GB_PER_S.get(hardware, DEFAULT_INTERCONNECT_GB_PER_S)
+    layers, hidden = estimate_model_shape(model_size_b)
+    transfer_ms = batch_size * tokens * hidden * 2 / (bandwidth * 1e9) * 1000  # fp16 activations
+
+    latency = 0.0
+    if tensor_parallel > 1:
+        latency += 2 * layers * (message_ms + 2 * (tensor_parallel - 1) / tensor_parallel * transfer_ms)
+    latency += (pipeline_parallel - 1) * (message_ms + transfer_ms)
+    return latency
+
+def estimate_sharded_latency(model_size_b, tokens, batch_size, hardware_type, tensor_parallel, pipeline_parallel):
+    # Tensor parallelism splits the compute terms of estimate_latency; pipeline stages run one after another
+    compute = (model_size_b / 7) * 1.5 + (batch_size * tokens) / 1000
+    latency = BASE_LATENCY.get(hardware_type.lower(), DEFAULT_BASE_LATENCY) + compute / tensor_parallel
+    latency += estimate_communication(model_size_b, tokens, batch_size, hardware_type, tensor_parallel, pipeline_parallel)
+    return round(latency, 2)
+
+def plan_sharding(model_size_b, tokens, batch_size, hardware_type, max_devices=64, max_tensor_parallel=8):
+    """
+    Ways to split a model across devices of hardware_type so each shard fits
+    in memory, cheapest per request first (then fastest). Tensor-parallel
+    sizes are powers of two up to max_tensor_parallel (the devices in one
+    node); pipeline stages are at most the model's layers.
+
+    Memory per device depends only on the number of devices, so the search
+    finds the fewest devices that fit and then, for each tensor-parallel
+    size, the fewest pipeline stages that reach it: more stages only add
+    hops and device cost, so every other configuration is dominated. Cost
+    assumes pipeline stages are kept busy by other requests, so a request
+    holds each stage for 1/pipeline_parallel of its latency. Returns []
+    if the model does not fit on max_devices devices.
+    """
+    hardware = hardware_type.lower()
+    limit = MEMORY_LIMITS.get(hardware, DEFAULT_MEMORY_LIMIT)
+    min_devices = next((devices for devices in range(1, max_devices + 1)
+                        if sharded_memory_usage(model_size_b, batch_size, devices) <= limit), None)
+    if min_devices is None:
+        return []
+
+    layers, _ = estimate_model_shape(model_size_b)
+    cost_per_sec = COST_PER_SEC.get(hardware, DEFAULT_COST_PER_SEC)
+    plans = []
+    tensor_parallel = 1
+    while tensor_parallel <= max_tensor_parallel:
+        pipeline_parallel = math.ceil(min_devices / tensor_parallel)
+        devices = tensor_parallel * pipeline_parallel
+        if devices <= max_devices and pipeline_parallel <= layers:
+            latency = estimate_sharded_latency(model_size_b, tokens, batch_size, hardware,
+                                               tensor_parallel, pipeline_parallel)
+            # Like estimate_cost, priced on the latency of a single request
+            request_latency = estimate_sharded_latency(model_size_b, tokens, 1, hardware,
+                                                       tensor_parallel, pipeline_parallel)
+            plans.append({
+                "Devices": devices,
+                "Tensor Parallel": tensor_parallel,
+                "Pipeline Parallel": pipeline_parallel,
+                "Memory per Device (GB)": sharded_memory_usage(model_size_b, batch_size, devices),
+                "Latency (ms)": latency,
+                "Communication (ms)": round(estimate_communication(model_size_b, tokens, batch_size, hardware,
+                                                                   tensor_parallel, pipeline_parallel), 2),
+                "Cost per request ($)": round(request_latency * cost_per_sec * tensor_parallel, 4)
+            })
+        if tensor_parallel >= min_devices:
+            break
+        tensor_parallel *= 2
+    plans.sort(key=lambda plan: (plan["Cost per request ($)"], plan["Latency (ms)"]))
+    return plans
+
+def decode_step_ms(model_size_b, batch_size, tokens_per_sequence=1):
+    """
+    Time of one decoding pass over batch_size sequences, each adding
+    tokens_per_sequence tokens: the model-size and token terms of
+    estimate_latency (its base latency is a per-request overhead).
+    Arguments may be NumPy arrays and broadcast.
+    """
+    return (np.asarray(model_size_b) / 7) * 1.5 + np.asarray(batch_size) * tokens_per_sequence / 1000
+
+def expected_accepted_tokens(acceptance_rate, draft_tokens):
+    """
+    Tokens produced per target-model pass in speculative decoding, when
+    each of draft_tokens drafted tokens is accepted with acceptance_rate
+    (Leviathan et al., 2023): (1 - α^(γ+1)) / (1 - α).
+    """
+    acceptance_rate = np.asarray(acceptance_rate, dtype=float)
+    draft_tokens = np.asarray(draft_tokens, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tokens = (1 - acceptance_rate ** (draft_tokens + 1)) / (1 - acceptance_rate)
+    return np.where(acceptance_rate >= 1, draft_tokens + 1, tokens)
+
+def speculative_throughput(model_size_b, draft_size_b, acceptance_rate, batch_size, draft_tokens):
+    """
+    Tokens/s of a full batch with speculative decoding: each round runs
+    draft_tokens passes of the draft model, then one pass of the target
+    model verifying draft_tokens + 1 tokens per sequence.
+    """
+    round_ms = (draft_tokens * decode_step_ms(draft_size_b, batch_size)
+                + decode_step_ms(model_size_b, batch_size, draft_tokens + 1))
+    return batch_size * expected_accepted_tokens(acceptance_rate, draft_tokens) / round_ms * 1000
+
+def compare_serving(model_size_b, batch_size, output_tokens, prompt_tokens=0, draft_size_b=None, acceptance_rate=0.7,
+                    max_draft_tokens=8, samples=10_000, seed=None):
+    """
+    Decode throughput (tokens/s) of each serving strategy, for every batch
+    size in batch_size (a number or an array), with request lengths drawn
+    from output_tokens and prompt lengths from prompt_tokens (numbers or
+    distributions, see sample_distribution).
+
+    - Static batching: a batch starts with one prefill pass over all its
+      prompts (padded to the longest) and runs until its longest request
+      finishes.
+    - Continuous batching: a finished request is replaced by a new one,
+      whose prefill pass stalls the batch. With mean output length L a
+      slot turns over every L tokens, so each output token also carries
+      1/L of a single-request prefill. Assumes enough queued requests to
+      refill every slot.
+    - Speculative decoding (if draft_size_b is given): continuous batching
+      with a draft model, using the number of draft tokens (up to
+      max_draft_tokens) that maximizes throughput at each batch size. Both
+      models prefill each admitted request.
+
+    Returns columns of NumPy arrays, one value per batch size.
+    """
+    batch = np.atleast_1d(np.asarray(batch_size, dtype=int))
+    rng = np.random.default_rng(seed)
+    lengths = np.maximum(np.rint(sample_distribution(output_tokens, samples * batch.max(), rng)), 1)
+    lengths = lengths.reshape(samples, batch.max())
+    prompts = np.maximum(np.rint(sample_distribution(prompt_tokens, samples * batch.max(), rng)), 0)
+    prompts = prompts.reshape(samples, batch.max())
+    # Mean length and expected longest length of the first b requests, for every b at once
+    mean = (np.cumsum(lengths.mean(axis=0)) / np.arange(1, batch.max() + 1))[batch - 1]
+    longest = np.maximum.accumulate(lengths, axis=1).mean(axis=0)[batch - 1]
+    longest_prompt = np.maximum.accumulate(prompts, axis=1).mean(axis=0)[batch - 1]
+
+    step = decode_step_ms(model_size_b, batch)
+    static_ms = longest * step + decode_step_ms(model_size_b, batch, longest_prompt)
+    # Prefill time per output token: one single-request prefill every mean-length tokens
+    admission = decode_step_ms(model_size_b, 1, prompts.mean()) / lengths.mean()
+    continuous = 1000 / (step / batch + admission)
+    result = {
+        "Batch Size": batch,
+        "Static Batching (tokens/s)": np.round(batch * mean / static_ms * 1000, 1),
+        "Continuous Batching (tokens/s)": np.round(continuous, 1)
+    }
+    if draft_size_b:
+        draft_tokens = np.arange(1, max_draft_tokens + 1)[:, None]
+        speculative = speculative_throughput(model_size_b, draft_size_b, acceptance_rate, batch, draft_tokens)
+        best = speculative.argmax(axis=0)
+        speculative = speculative[best, np.arange(len(batch))]
+        admission += decode_step_ms(draft_size_b, 1, prompts.mean()) / lengths.mean()
+        speculative = 1000 / (1000 / speculative + admission)
+        result["Speculative Decoding (tokens/s)"] = np.round(speculative, 1)
+        result["Draft Tokens"] = best + 1
+        result["Speculative Speedup"] = np.round(speculative / continuous, 2)
+    return result
+
+def _hardware_values(table, default, hardware_type, hardware_index):
+    # Per-scenario value of a hardware table; hardware_index selects from hardware_type's names
+    if isinstance(hardware_type, str):
+        return table.get(hardware_type.lower(), default)
+    values = np.array([table.get(name.lower(), default) for name in hardware_type], dtype=float)
+    return values[np.asarray(hardware_index)]
+
+def _round(values, digits):
+    # np.round scales by 10**digits and can round values near a half the other
+    # way from round(); redo those with round() so results match calculate()
+    rounded = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(value, digits) for value in values[near_half].tolist()]
+    return rounded
+
+def calculate_many(model_size_b, tokens, batch_size, hardware_type, hardware_index=None):
+    """
+    calculate() for many scenarios at once, as typed NumPy columns:
+    latency_ms, memory_gb, cost_per_request_usd and compatible. The inputs
+    are arrays (or numbers) that broadcast together. hardware_type is a
+    single name or, for mixed hardware, a list of names with hardware_index
+    giving each scenario's position in it (e.g. an Arrow dictionary column).
+    Values equal calculate()'s, rounding included.
+    """
+    model_size_b, tokens, batch_size = np.broadcast_arrays(*(np.atleast_1d(np.asarray(values, dtype=float))
+                                                             for values in (model_size_b, tokens, batch_size)))
+    base = _hardware_values(BASE_LATENCY, DEFAULT_BASE_LATENCY, hardware_type, hardware_index)
+    cost_per_sec = _hardware_values(COST_PER_SEC, DEFAULT_COST_PER_SEC, hardware_type, hardware_index)
+    limit = _hardware_values(MEMORY_LIMITS, DEFAULT_MEMORY_LIMIT, hardware_type, hardware_index)
+
+    fixed = base + (model_size_b / 7) * 1.5
+    memory = _round(model_size_b * 2 + batch_size * 0.5, 2)
+    return {
+        "latency_ms": _round(fixed + (batch_size * tokens) / 1000, 2),
+        "memory_gb": memory,
+        "cost_per_request_usd": _round(_round(fixed + tokens / 1000, 2) * cost_per_sec, 4),
+        "compatible": memory <= limit
+    }
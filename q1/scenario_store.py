@@ -0,0 +1,120 @@
+"""
+Run calculator sweeps from and to Arrow/Parquet files.
+
+    python scenario_store.py scenarios.csv results.arrow
+    python scenario_store.py scenarios.parquet results.parquet
+
+Scenarios are rows with model_size_b, tokens, batch_size and hardware_type
+columns, read from CSV, Parquet or Arrow IPC (.arrow/.feather) files. Results
+keep those columns and add latency_ms, memory_gb, cost_per_request_usd and
+compatible. Input is processed one record batch at a time, so sweeps larger
+than memory stream through. Arrow IPC results are written uncompressed:
+load_results() memory-maps them, so reloading takes milliseconds whatever
+their size and columns reach NumPy without copying.
+"""
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from inference_calculator import calculate_many
+
+SCENARIO_SCHEMA = pa.schema([
+    ("model_size_b", pa.float64()),
+    ("tokens", pa.int64()),
+    ("batch_size", pa.int64()),
+    ("hardware_type", pa.dictionary(pa.int32(), pa.string()))
+])
+
+# hardware_type is stored as plain strings: an Arrow IPC file allows only one
+# dictionary per column, and the names in later batches are not known up front
+RESULT_SCHEMA = pa.schema(list(SCENARIO_SCHEMA)[:3] + [
+    ("hardware_type", pa.string()),
+    ("latency_ms", pa.float64()),
+    ("memory_gb", pa.float64()),
+    ("cost_per_request_usd", pa.float64()),
+    ("compatible", pa.bool_())
+])
+
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+def iter_scenarios(path, batch_size=1_000_000):
+    """Yield the scenarios in path as record batches of SCENARIO_SCHEMA."""
+    names = SCENARIO_SCHEMA.names
+    if path.endswith(ARROW_SUFFIXES):
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    elif path.endswith(".parquet"):
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=names)
+    elif path.endswith(".csv"):
+        types = {field.name: field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+                 for field in SCENARIO_SCHEMA}
+        batches = pa_csv.open_csv(path, convert_options=pa_csv.ConvertOptions(column_types=types, include_columns=names))
+    else:
+        raise ValueError(f"Unsupported scenario file: {path} (expected .csv, .parquet or {', '.join(ARROW_SUFFIXES)})")
+
+    for batch in batches:
+        missing = [name for name in names if name not in batch.schema.names]
+        if missing:
+            raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+        columns = [batch.column(name) for name in names]
+        if not pa.types.is_dictionary(columns[3].type):
+            columns[3] = columns[3].dictionary_encode()
+        yield pa.RecordBatch.from_arrays([column.cast(field.type) for column, field in zip(columns, SCENARIO_SCHEMA)],
+                                         schema=SCENARIO_SCHEMA)
+
+def calculate_batch(batch):
+    """Add the calculator results to a record batch of scenarios."""
+    nulls = [name for name in SCENARIO_SCHEMA.names if batch.column(name).null_count]
+    if nulls:
+        raise ValueError(f"Scenarios must not have empty values: {', '.join(nulls)}")
+    hardware = batch.column("hardware_type")
+    results = calculate_many(batch.column("model_size_b").to_numpy(),
+                             batch.column("tokens").to_numpy(),
+                             batch.column("batch_size").to_numpy(),
+                             hardware.dictionary.to_pylist(),
+                             hardware.indices.to_numpy())
+    columns = [batch.column(name) for name in SCENARIO_SCHEMA.names[:3]] + [hardware.cast(pa.string())]
+    columns += [pa.array(results[field.name], type=field.type) for field in RESULT_SCHEMA if field.name in results]
+    return pa.RecordBatch.from_arrays(columns, schema=RESULT_SCHEMA)
+
+def run(scenarios_path, results_path, batch_size=1_000_000):
+    """Calculate every scenario in scenarios_path and write the results; returns the number of rows."""
+    rows = 0
+    if results_path.endswith(ARROW_SUFFIXES):
+        writer = pa.ipc.new_file(results_path, RESULT_SCHEMA)
+    elif results_path.endswith(".parquet"):
+        writer = pq.ParquetWriter(results_path, RESULT_SCHEMA, compression="zstd")
+    else:
+        raise ValueError(f"Unsupported results file: {results_path} (expected .parquet or {', '.join(ARROW_SUFFIXES)})")
+    with writer:
+        for batch in iter_scenarios(scenarios_path, batch_size):
+            writer.write_batch(calculate_batch(batch))
+            rows += batch.num_rows
+    return rows
+
+def load_results(path):
+    """
+    Open a results file as an Arrow table. Arrow IPC files are memory-mapped
+    rather than read, so only the pages that are used get loaded; Parquet
+    files are decoded in full.
+    """
+    if path.endswith(ARROW_SUFFIXES):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return pq.read_table(path, memory_map=True)
+
+def column_arrays(table, name):
+    """A numeric column as one NumPy array per record batch, without copying."""
+    return [chunk.to_numpy(zero_copy_only=True) for chunk in table.column(name).chunks]
+
+def column_array(table, name):
+    """A numeric column as a single NumPy array; zero-copy when the table has one record batch."""
+    arrays = column_arrays(table, name)
+    return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    print(f"{run(sys.argv[1], sys.argv[2]):,} scenarios written to {sys.argv[2]}")
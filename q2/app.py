@@ -1,15 +1,28 @@
-import streamlit as st
-from recommendation_engine import recommend_agents
-
-st.set_page_config(page_title="AI Coding Agent Recommender", layout="centered")
-
-st.title("🤖 LLM-Powered Coding Agent Recommender")
-st.write("Enter a coding task below, and get smart, LLM-backed recommendations!")
-
-task = st.text_area("📝 Describe your coding task")
-
-if st.button("Get Recommendations") and task.strip():
-    with st.spinner("Thinking... 🤔"):
-        recommendations = recommend_agents(task)
-    st.subheader("🔍 Top Recommendations:")
-    st.markdown(recommendations)
+import streamlit as st
+from recommendation_engine import create_client, recommend_agents
+from request_strategy import RecommendationError
+
+st.set_page_config(page_title="AI Coding Agent Recommender", layout="centered")
+
+@st.cache_resource
+def openai_client():
+    # Created on the first recommendation, then shared by every session, so they reuse its kept-alive connections
+    return create_client()
+
+st.title("🤖 LLM-Powered Coding Agent Recommender")
+st.write("Enter a coding task below, and get smart, LLM-backed recommendations!")
+
+task = st.text_area("📝 Describe your coding task")
+
+if st.button("Get Recommendations") and task.strip():
+    try:
+        with st.spinner("Thinking... 🤔"):
+            recommendations = recommend_agents(task, client=openai_client())
+    except RecommendationError as e:
+        if e.attempts:
+            st.error(f"No recommendation could be generated ({', '.join(attempt['outcome'] for attempt in e.attempts)}). Please try again.")
+        else:
+            st.error(f"No recommendation could be generated: {e}.")
+    else:
+        st.subheader("🔍 Top Recommendations:")
+        st.markdown(recommendations)
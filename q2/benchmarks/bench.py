@@ -0,0 +1,276 @@
+"""
+Offline benchmark of recommendation quality, latency, tokens and cost.
+
+    python benchmarks/bench.py                                   # llm:gpt-4 against the in-process mock, and the local scorer
+    python benchmarks/bench.py -b llm:gpt-4o-mini -b llm:gpt-4o-mini,gpt-4 -b keyword
+    python benchmarks/bench.py --base-url https://api.openai.com/v1 --record benchmarks/recorded.json
+    python benchmarks/bench.py --replay benchmarks/recorded.json --save results.json
+
+Every backend recommends agents for the labeled tasks in tasks.json. A task
+is answered correctly when at least one of its expected agents is in the
+backend's top 3.
+
+Backends:
+    llm:MODEL[,MODEL...]   the recommend_agents path: llm_messages() sent
+                           through a RequestStrategy, tiered over the models
+    keyword                a local scorer that ranks agents by the words
+                           they share with the task
+
+LLM backends call the mock server from mock_openai_server.py unless
+--base-url or --replay is given. The mock ranks agents by word overlap, so
+its accuracy only checks the plumbing; use --record against the real API
+once, then --replay the recording to compare backends without a key.
+Replayed responses take as long as they did when recorded.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+Q2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Q2_DIR)
+
+from prompt_cache import cached_tokens, serialize_messages
+from request_strategy import RecommendationError, RequestStrategy, parse_recommendations
+
+TASKS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks.json")
+AGENTS_PATH = os.path.join(Q2_DIR, "agents_db.json")
+
+# USD per 1M input and output tokens; cached input tokens are billed at half the input price
+PRICES = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4.1": (2.0, 8.0),
+    "gpt-4.1-mini": (0.4, 1.6)
+}
+
+# Agent names in recommended order and the completions made for them, as (model, ChatCompletion)
+BackendAnswer = namedtuple("BackendAnswer", "recommended completions")
+
+def load_tasks(path=TASKS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["tasks"]
+
+def load_agents(path=AGENTS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def completion_key(model, messages):
+    return hashlib.sha256(f"{model}\n{serialize_messages(messages)}".encode("utf-8")).hexdigest()
+
+class RecordingClient:
+    """
+    Wraps an OpenAI client and keeps every chat completion made through it
+    in calls, as (key, model, seconds, ChatCompletion).
+    """
+
+    def __init__(self, client, calls=None):
+        self._client = client
+        self.calls = [] if calls is None else calls
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def with_options(self, **options):
+        return RecordingClient(self._client.with_options(**options), self.calls)
+
+    def _create(self, model, messages, **params):
+        start = time.perf_counter()
+        response = self._client.chat.completions.create(model=model, messages=messages, **params)
+        self.calls.append((completion_key(model, messages), model, time.perf_counter() - start, response))
+        return response
+
+    def save(self, path):
+        records = {key: {"model": model, "seconds": seconds, "response": response.model_dump()}
+                   for key, model, seconds, response in self.calls}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2, sort_keys=True)
+
+class ReplayClient(RecordingClient):
+    """Answers chat completions from a file saved by RecordingClient.save, sleeping as long as the original call took."""
+
+    def __init__(self, path, calls=None):
+        super().__init__(None, calls)
+        with open(path, "r", encoding="utf-8") as f:
+            self.records = json.load(f)
+
+    def with_options(self, **options):
+        return self
+
+    def _create(self, model, messages, **params):
+        from openai.types.chat import ChatCompletion
+        key = completion_key(model, messages)
+        if key not in self.records:
+            raise LookupError(f"No recorded {model} completion for this prompt")
+        record = self.records[key]
+        time.sleep(record["seconds"])
+        response = ChatCompletion.model_validate(record["response"])
+        self.calls.append((key, model, record["seconds"], response))
+        return response
+
+def llm_backend(client, models, attempt_timeout=30.0):
+    """The recommend_agents path with client and a tiered strategy over models."""
+    from recommendation_engine import llm_messages
+    strategy = RequestStrategy(models=models, attempt_timeout=attempt_timeout)
+
+    def recommend(task, agents):
+        made = len(client.calls)
+        try:
+            text = strategy.run(client, llm_messages(task, agents), agents).text
+        except RecommendationError:
+            text = ""
+        return BackendAnswer(parse_recommendations(text, agents),
+                             [(model, response) for _, model, _, response in client.calls[made:]])
+
+    return recommend
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {"and", "the", "for", "with", "our", "that", "what", "want", "need", "from", "into", "all", "new", "have"}
+
+# Field weights of the keyword scorer, as in q3's tool search
+KEYWORD_FIELDS = {"best_for": 3.0, "strengths": 2.0}
+
+def stems(text):
+    # Five-letter prefixes, so "refactor" matches "refactoring" and "document" "documentation"
+    return {word[:5] for word in WORD_PATTERN.findall(text.lower()) if len(word) > 2 and word not in STOP_WORDS}
+
+def keyword_backend(agents):
+    """Rank agents by the task words found in their best_for and strengths, weighted by how rare each word is."""
+    fields = [{field: stems(" ".join(agent[field])) for field in KEYWORD_FIELDS} for agent in agents]
+    frequency = {}
+    for agent_fields in fields:
+        for stem in set().union(*agent_fields.values()):
+            frequency[stem] = frequency.get(stem, 0) + 1
+    idf = {stem: math.log(1 + len(agents) / count) for stem, count in frequency.items()}
+
+    def recommend(task, _agents):
+        words = stems(task)
+        scores = [sum(weight * idf[stem] for field, weight in KEYWORD_FIELDS.items()
+                      for stem in words & agent_fields[field])
+                  for agent_fields in fields]
+        ranked = sorted(range(len(agents)), key=lambda i: -scores[i])
+        return BackendAnswer([agents[i]["name"] for i in ranked[:3] if scores[i] > 0], [])
+
+    return recommend
+
+def cost(model, usage, prices):
+    if model not in prices or usage is None:
+        return None
+    input_price, output_price = prices[model]
+    cached = cached_tokens(SimpleNamespace(usage=usage))
+    return ((usage.prompt_tokens - cached / 2) * input_price + usage.completion_tokens * output_price) / 1e6
+
+def run_backend(recommend, tasks, agents, prices):
+    """Recommend for every task in turn and summarize quality, latency, tokens and cost."""
+    hits, recall, answered, latencies = 0, 0.0, 0, []
+    prompt_tokens, completion_tokens, cached, total_cost, priced = 0, 0, 0, 0.0, True
+    for entry in tasks:
+        start = time.perf_counter()
+        answer = recommend(entry["task"], agents)
+        latencies.append(time.perf_counter() - start)
+        top = set(answer.recommended[:3])
+        expected = set(entry["expected"])
+        hits += bool(top & expected)
+        recall += len(top & expected) / len(expected)
+        answered += len(answer.recommended) >= 3
+        for model, response in answer.completions:
+            usage = response.usage
+            if usage is not None:
+                prompt_tokens += usage.prompt_tokens
+                completion_tokens += usage.completion_tokens
+                cached += cached_tokens(response)
+            price = cost(model, usage, prices)
+            priced = priced and price is not None
+            total_cost += price or 0.0
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    count = len(tasks)
+    return {
+        "top3_accuracy": hits / count,
+        "recall_at_3": recall / count,
+        "answered": answered / count,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "prompt_tokens": prompt_tokens / count,
+        "completion_tokens": completion_tokens / count,
+        "cached_tokens": cached / count,
+        "usd_per_1k_requests": total_cost / count * 1000 if priced else float("nan")
+    }
+
+def print_table(title, rows):
+    print(f"\n{title}")
+    columns = list(next(iter(rows.values())))
+    width = max(len(name) for name in rows)
+    print(" " * width + "".join(f"{column:>20}" for column in columns))
+    for name, metrics in rows.items():
+        print(name.ljust(width) + "".join(f"{metrics[column]:>20.3f}" for column in columns))
+
+def parse_price(value):
+    model, prices = value.split("=", 1)
+    input_price, output_price = prices.split(",")
+    return model, (float(input_price), float(output_price))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark q2 recommendation backends on labeled tasks")
+    parser.add_argument("-b", "--backend", action="append", metavar="SPEC",
+                        help="llm:MODEL[,MODEL...] or keyword (repeatable; default llm:gpt-4 and keyword)")
+    parser.add_argument("--tasks", default=TASKS_PATH)
+    parser.add_argument("--base-url", help="OpenAI-compatible API for the LLM backends instead of the mock server")
+    parser.add_argument("--record", help="save every completion to this file for --replay")
+    parser.add_argument("--replay", help="answer LLM backends from a file saved with --record")
+    parser.add_argument("--mock-latency", type=float, default=0.05, help="median seconds per mock server response")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per LLM attempt")
+    parser.add_argument("--price", action="append", default=[], type=parse_price, metavar="MODEL=IN,OUT",
+                        help="USD per 1M input and output tokens of a model (repeatable)")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    specs = args.backend or ["llm:gpt-4", "keyword"]
+    tasks = load_tasks(args.tasks)
+    agents = load_agents()
+    prices = dict(PRICES, **dict(args.price))
+
+    client, server = None, None
+    if any(spec.startswith("llm:") for spec in specs):
+        if args.replay:
+            client = ReplayClient(args.replay)
+        else:
+            from openai import OpenAI
+            api_key = os.getenv("OPENAI_API_KEY")
+            if args.base_url is None:
+                from mock_openai_server import MockOptions, start_mock_server
+                server, args.base_url = start_mock_server(options=MockOptions(latency=args.mock_latency, seed=0))
+                api_key = "mock"
+            client = RecordingClient(OpenAI(base_url=args.base_url, api_key=api_key))
+
+    results = {}
+    for spec in specs:
+        if spec == "keyword":
+            recommend = keyword_backend(agents)
+        elif spec.startswith("llm:"):
+            recommend = llm_backend(client, [model for model in spec[4:].split(",") if model], args.timeout)
+        else:
+            parser.error(f"unknown backend: {spec}")
+        results[spec] = run_backend(recommend, tasks, agents, prices)
+    if server is not None:
+        server.shutdown()
+
+    print_table(f"Recommendations for {len(tasks)} labeled tasks", results)
+
+    if args.record and client is not None:
+        client.save(args.record)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
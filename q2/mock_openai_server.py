@@ -0,0 +1,171 @@
+"""
+Local stand-in for the OpenAI chat completions API, for trying request
+strategies without a key or network access.
+
+    python mock_openai_server.py --port 8001 --latency 0.8 --stall-rate 0.1 --invalid-model gpt-4o-mini
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test streamlit run app.py
+
+Answers recommend three agents from agents_db.json ranked by word overlap
+with the task. Latency is lognormal around --latency (per model with
+--model-latency), and --stall-rate of the requests stall for
+--stall-seconds, like a stuck upstream call.
+
+Prompt caching works like OpenAI's: a prompt whose first 1024 (or
+--cache-min-tokens) or more tokens match a recent prompt has that prefix,
+in 128-token steps, reported as usage.prompt_tokens_details.cached_tokens.
+--prefill-ms-per-1k adds latency for each 1000 prompt tokens that were not
+cached.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from prompt_cache import common_prefix_length, estimate_tokens, serialize_messages
+
+AGENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents_db.json")
+
+def words(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+def task_text(messages):
+    """The task of a recommendation prompt, or the whole last message if it has no task section."""
+    content = messages[-1]["content"] if messages else ""
+    match = re.search(r"## Task:\s*(.*?)(?:\n---|\Z)", content, re.S)
+    return match.group(1) if match else content
+
+def mock_answer(task, agents):
+    task_words = words(task)
+    ranked = sorted(agents, key=lambda agent: -len(task_words & words(" ".join(agent["strengths"] + agent["best_for"]))))
+    return "\n".join(f"{i}. {agent['name']} - Good fit for: {', '.join(agent['best_for'])}"
+                     for i, agent in enumerate(ranked[:3], 1))
+
+CACHE_BLOCK_TOKENS = 128
+
+class MockOptions:
+    def __init__(self, latency=0.5, jitter=0.3, model_latency=None, stall_rate=0.0, stall_seconds=30.0,
+                 invalid_models=(), seed=None, prefill_ms_per_1k=0.0, cache_min_tokens=1024):
+        self.latency = latency
+        self.jitter = jitter
+        self.model_latency = dict(model_latency or {})
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.invalid_models = set(invalid_models)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.cache_min_tokens = cache_min_tokens
+        self.recent_prompts = deque(maxlen=64)
+
+    def cached_tokens(self, prompt):
+        """Tokens of prompt served from the simulated prompt cache; remembers prompt."""
+        with self.lock:
+            shared = max((common_prefix_length(prompt, previous) for previous in self.recent_prompts), default=0)
+            self.recent_prompts.append(prompt)
+        tokens = estimate_tokens(prompt[:shared])
+        if tokens < self.cache_min_tokens:
+            return 0
+        return tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+
+    def delay(self, model):
+        median = self.model_latency.get(model, self.latency)
+        with self.lock:
+            self.requests += 1
+            if self.random.random() < self.stall_rate:
+                return self.stall_seconds
+            return median * math.exp(self.random.gauss(0.0, self.jitter))
+
+def make_handler(options, agents):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep connections open between requests, as the real API does; without
+        # Nagle's algorithm, so the headers and body are not held back on them
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = body.get("model", "mock")
+            messages = body.get("messages", [])
+            prompt = serialize_messages(messages)
+            prompt_tokens = estimate_tokens(prompt)
+            cached = options.cached_tokens(prompt)
+            time.sleep(options.delay(model) + (prompt_tokens - cached) / 1000 * options.prefill_ms_per_1k / 1000)
+
+            if model in options.invalid_models:
+                answer = "It depends on your needs; several tools could work."
+            else:
+                answer = mock_answer(task_text(messages), agents)
+            completion_tokens = estimate_tokens(answer)
+            payload = json.dumps({
+                "id": f"chatcmpl-mock-{options.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens,
+                          "prompt_tokens_details": {"cached_tokens": cached}}
+            }).encode("utf-8")
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (per-attempt timeout)
+                pass
+
+    return Handler
+
+def start_mock_server(port=0, options=None):
+    """Serve in a background thread; returns (server, base_url). Call server.shutdown() to stop."""
+    with open(AGENTS_PATH, "r") as f:
+        agents = json.load(f)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(options or MockOptions(), agents))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="median seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.3, help="lognormal sigma of the latency")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="median latency of one model (repeatable)")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of requests that stall")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--invalid-model", action="append", default=[], help="model whose answers fail validation")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="added latency per 1000 prompt tokens not served from the prompt cache")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="shortest prefix the prompt cache reuses")
+    args = parser.parse_args()
+
+    options = MockOptions(args.latency, args.jitter,
+                          {model: float(seconds) for model, seconds in (item.split("=", 1) for item in args.model_latency)},
+                          args.stall_rate, args.stall_seconds, args.invalid_model, args.seed,
+                          args.prefill_ms_per_1k, args.cache_min_tokens)
+    server, base_url = start_mock_server(args.port, options)
+    print(f"Mock OpenAI API at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
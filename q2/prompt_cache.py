@@ -0,0 +1,76 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and single punctuation marks; close enough to BPE token counts for accounting
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text):
+    return len(TOKEN_PATTERN.findall(text))
+
+def serialize_messages(messages):
+    """The text of a chat request in the order a provider reads it, for prefix comparisons."""
+    return "".join(f"<{message['role']}>{message['content']}" for message in messages)
+
+def common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    if a[:n] == b[:n]:
+        return n
+    low, high = 0, n
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def cached_tokens(response):
+    """Prompt tokens the provider served from its prompt cache, if it reports them."""
+    details = getattr(getattr(response, "usage", None), "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+class PrefixTracker:
+    """
+    Reports how much of each request's prompt repeats the previous
+    request's, which is the part a provider-side prompt cache can reuse.
+    """
+
+    def __init__(self):
+        self._previous = ""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.shared_tokens = 0
+        self.cached_tokens = 0
+
+    def observe(self, messages):
+        """Record a request; returns (prompt tokens, tokens of the prefix shared with the previous request)."""
+        text = serialize_messages(messages)
+        with self._lock:
+            previous, self._previous = self._previous, text
+        prompt = estimate_tokens(text)
+        shared = estimate_tokens(text[:common_prefix_length(previous, text)])
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt
+            self.shared_tokens += shared
+        logger.info("prompt tokens: %d, shared prefix with previous request: %d", prompt, shared)
+        return prompt, shared
+
+    def record_response(self, response):
+        cached = cached_tokens(response)
+        with self._lock:
+            self.cached_tokens += cached
+        return cached
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "shared_prefix_tokens": self.shared_tokens,
+                "provider_cached_tokens": self.cached_tokens
+            }
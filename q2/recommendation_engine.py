@@ -1,60 +1,96 @@
-import json
-import os
-from openai import OpenAI
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def load_agents():
-    with open('agents_db.json', 'r') as f:
-        return json.load(f)
-
-def llm_prompt(task_description, agents):
-    agents_descriptions = "\n".join(
-        [f"### {a['name']}\nStrengths: {', '.join(a['strengths'])}\nBest For: {', '.join(a['best_for'])}\nLimitations: {', '.join(a['limitations'])}\n"
-         for a in agents]
-    )
-
-    return f"""
-You are an expert AI assistant helping a developer choose the best AI coding agent.
-
-The developer gives you a coding task. You have a database of coding agents, each with their own strengths, best-use cases, and limitations.
-
-Your job is to:
-1. Understand the task.
-2. Analyze which agents are most suitable.
-3. Recommend the **top 3 agents** based on alignment with the task.
-4. Provide a justification for each recommendation.
-
----
-
-## Task:
-{task_description}
-
----
-
-## Available Agents:
-{agents_descriptions}
-
----
-
-Now, give your top 3 agent recommendations in this format:
-
-1. [Agent Name] - [Short justification]  
-2. [Agent Name] - [Short justification]  
-3. [Agent Name] - [Short justification]
-"""
-
-def recommend_agents(task_description):
-    agents = load_agents()
-    prompt = llm_prompt(task_description, agents)
-
-    chat_completion = client.chat.completions.create(
-        model="gpt-4",  # or "gpt-3.5-turbo"
-        messages=[
-            {"role": "system", "content": "You are an expert AI recommender for coding assistants."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3
-    )
-
-    return chat_completion.choices[0].message.content
+import json
+import os
+import threading
+from prompt_cache import PrefixTracker
+from request_strategy import RecommendationError, RequestStrategy
+
+# Idle connections are kept this long (httpx's default is 5 s), so the next
+# recommendation usually reuses one instead of repeating the TCP and TLS handshake
+KEEPALIVE_EXPIRY = 60.0
+# Idle connections kept open; each attempt (and each hedge) in flight uses one
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+_client = None
+_client_lock = threading.Lock()
+
+# Models, per-attempt timeout and hedging (see request_strategy.py); by default one gpt-4 attempt of at most 30 s
+default_strategy = RequestStrategy.from_env()
+
+# Prompt tokens per request and how many repeat the previous request's prefix (logged at INFO)
+prefix_tracker = PrefixTracker()
+
+def create_client():
+    """
+    An OpenAI client with a keep-alive connection pool. The SDK is imported
+    here, on first use, because importing it takes most of a second.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        raise RecommendationError("OPENAI_API_KEY is not set", [])
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI
+    # The Limits class of whichever httpx the SDK uses
+    limits = type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=DEFAULT_CONNECTION_LIMITS.max_connections,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=DefaultHttpxClient(limits=limits))
+
+def get_client():
+    """The client shared by every call in this process, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client()
+        return _client
+
+def load_agents():
+    with open('agents_db.json', 'r') as f:
+        return json.load(f)
+
+def catalog_prompt(agents):
+    # Everything except the task, so it is byte-identical across requests and
+    # provider-side prompt caching can reuse it; the task goes last
+    agents_descriptions = "\n".join(
+        [f"### {a['name']}\nStrengths: {', '.join(a['strengths'])}\nBest For: {', '.join(a['best_for'])}\nLimitations: {', '.join(a['limitations'])}\n"
+         for a in agents]
+    )
+
+    return f"""You are an expert AI recommender for coding assistants, helping a developer choose the best AI coding agent.
+
+The developer gives you a coding task. You have a database of coding agents, each with their own strengths, best-use cases, and limitations.
+
+Your job is to:
+1. Understand the task.
+2. Analyze which agents are most suitable.
+3. Recommend the **top 3 agents** based on alignment with the task.
+4. Provide a justification for each recommendation.
+
+---
+
+## Available Agents:
+{agents_descriptions}
+
+---
+
+Give your top 3 agent recommendations in this format:
+
+1. [Agent Name] - [Short justification]  
+2. [Agent Name] - [Short justification]  
+3. [Agent Name] - [Short justification]
+"""
+
+def llm_messages(task_description, agents):
+    return [
+        {"role": "system", "content": catalog_prompt(agents)},
+        {"role": "user", "content": f"## Task:\n{task_description}"}
+    ]
+
+def recommend_agents(task_description, strategy=None, client=None):
+    agents = load_agents()
+    messages = llm_messages(task_description, agents)
+    prefix_tracker.observe(messages)
+
+    result = (strategy or default_strategy).run(client or get_client(), messages, agents)
+    prefix_tracker.record_response(result.response)
+
+    return result.text
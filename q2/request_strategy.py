@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+# The answer used, the model that gave it, whether it passed validation, the
+# ChatCompletion it came from and one entry per attempt made
+StrategyResult = namedtuple("StrategyResult", "text model valid response attempts")
+
+class RecommendationError(RuntimeError):
+    """Raised when no attempt returned an answer; attempts lists what happened to each one."""
+
+    def __init__(self, message, attempts):
+        super().__init__(message)
+        self.attempts = attempts
+
+def parse_recommendations(text, agents):
+    """Names of known agents recommended in text's numbered lines, in order and without repeats."""
+    names = {}
+    for agent in agents:
+        names[agent["name"].lower()] = agent["name"]
+        # e.g. "DeepCode" for "DeepCode (now Snyk Code)"
+        names.setdefault(agent["name"].split(" (")[0].lower(), agent["name"])
+    pattern = re.compile("|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)))
+
+    recommended = []
+    for line in text.splitlines():
+        if not re.match(r"\s*\d+[.)]", line):
+            continue
+        match = pattern.search(line.lower())
+        if match and names[match.group(0)] not in recommended:
+            recommended.append(names[match.group(0)])
+    return recommended
+
+def is_valid_answer(text, agents, count=3):
+    return len(parse_recommendations(text or "", agents)) >= count
+
+class LatencyTracker:
+    """Latencies of recent successful attempts, for hedging after the observed p95."""
+
+    def __init__(self, window=200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, p, default):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < 20:
+            return default
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+class _Attempt:
+    """
+    One request to a model, sent from its own thread so that a hedge can go
+    out while it is still waiting, and so that no attempt ever queues behind
+    other requests' attempts. started is when the request was actually sent.
+    """
+
+    def __init__(self, hedge):
+        self.hedge = hedge
+        self.started = None
+        self.seconds = None
+        self.future = Future()
+        self.sent = threading.Event()
+
+class RequestStrategy:
+    """
+    How the recommendation model is called.
+
+    models are tried in order (tiered): a cheaper, faster model first, and
+    the next one only if the answer does not name enough agents from
+    agents_db.json, or the attempt failed or timed out. The last model's
+    answer is returned even if it fails validation.
+
+    Each model gets attempt_timeout seconds from when its first request is
+    sent. With hedge_delay set, a second, identical request is sent if the
+    first has not answered after that many seconds (or has failed), and
+    whichever answers first is used. The hedge's timeout is what is left of
+    the model's time, so a losing request is abandoned by then at the
+    latest and never holds its thread or connection longer. hedge_delay
+    "p95" uses the 95th percentile of recent latencies, or
+    fallback_hedge_delay until enough have been seen.
+    """
+
+    def __init__(self, models=("gpt-4",), attempt_timeout=30.0, hedge_delay=None, fallback_hedge_delay=5.0,
+                 temperature=0.3):
+        self.models = list(models)
+        self.attempt_timeout = attempt_timeout
+        self.hedge_delay = hedge_delay
+        self.fallback_hedge_delay = fallback_hedge_delay
+        self.temperature = temperature
+        self.latencies = {model: LatencyTracker() for model in self.models}
+
+    @classmethod
+    def from_env(cls):
+        """Configure from Q2_MODELS, Q2_ATTEMPT_TIMEOUT and Q2_HEDGE_DELAY (seconds, "p95", or unset for no hedging)."""
+        hedge_delay = os.getenv("Q2_HEDGE_DELAY") or None
+        if hedge_delay not in (None, "p95"):
+            hedge_delay = float(hedge_delay)
+        return cls(
+            models=[model.strip() for model in os.getenv("Q2_MODELS", "gpt-4").split(",") if model.strip()],
+            attempt_timeout=float(os.getenv("Q2_ATTEMPT_TIMEOUT", 30)),
+            hedge_delay=hedge_delay
+        )
+
+    def _hedge_delay(self, model):
+        if self.hedge_delay == "p95":
+            return self.latencies[model].percentile(95, self.fallback_hedge_delay)
+        return self.hedge_delay
+
+    def _send(self, attempt, client, model, messages, timeout):
+        attempt.started = time.perf_counter()
+        attempt.sent.set()
+        try:
+            response = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature
+            )
+        except Exception as e:
+            attempt.seconds = time.perf_counter() - attempt.started
+            attempt.future.set_exception(e)
+        else:
+            attempt.seconds = time.perf_counter() - attempt.started
+            attempt.future.set_result(response)
+
+    def _start(self, client, model, messages, hedge, timeout):
+        attempt = _Attempt(hedge)
+        threading.Thread(target=self._send, args=(attempt, client, model, messages, timeout),
+                         name="q2-request", daemon=True).start()
+        attempt.sent.wait()
+        return attempt
+
+    def _call(self, client, model, messages, attempts):
+        """One answer from model, hedged if configured; raises the last error if every attempt failed."""
+        first = self._start(client, model, messages, False, self.attempt_timeout)
+        deadline = first.started + self.attempt_timeout
+        hedge_delay = self._hedge_delay(model)
+        hedge_at = None if hedge_delay is None else first.started + hedge_delay
+        pending = {first.future: first}
+        hedged = False
+        error = None
+        while pending:
+            wake = deadline if hedged or hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(pending, timeout=max(0.0, wake - time.perf_counter()), return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    attempts.append({"model": model, "hedge": attempt.hedge, "outcome": type(e).__name__,
+                                     "seconds": round(attempt.seconds, 3)})
+                    continue
+                self.latencies[model].record(attempt.seconds)
+                attempts.append({"model": model, "hedge": attempt.hedge, "outcome": "answered",
+                                 "seconds": round(attempt.seconds, 3)})
+                return response
+            now = time.perf_counter()
+            if now >= deadline:
+                for attempt in pending.values():
+                    attempts.append({"model": model, "hedge": attempt.hedge, "outcome": "timeout",
+                                     "seconds": round(now - attempt.started, 3)})
+                break
+            # Hedge once: when the delay has passed, or straight away if the first attempt failed
+            if not hedged and hedge_at is not None and (now >= hedge_at or not pending):
+                hedge = self._start(client, model, messages, True, deadline - now)
+                pending[hedge.future] = hedge
+                hedged = True
+        raise error or TimeoutError(f"{model} did not answer within {self.attempt_timeout}s")
+
+    def run(self, client, messages, agents):
+        """
+        Get a recommendation as a StrategyResult. Raises RecommendationError
+        if no model answered at all.
+        """
+        attempts = []
+        answer = None
+        for model in self.models:
+            try:
+                response = self._call(client, model, messages, attempts)
+            except Exception:
+                continue
+            text = response.choices[0].message.content
+            answer = StrategyResult(text, model, is_valid_answer(text, agents), response, attempts)
+            if answer.valid:
+                return answer
+        if answer is None:
+            raise RecommendationError("No model returned a recommendation", attempts)
+        return answer
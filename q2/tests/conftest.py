@@ -0,0 +1,31 @@
+"""Fixtures for the q2 tests, which run against the local mock server. Run from q2 with: python -m pytest tests"""
+import json
+import os
+import sys
+
+import pytest
+
+Q2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Q2_DIR)
+
+from mock_openai_server import start_mock_server
+
+@pytest.fixture
+def agents():
+    with open(os.path.join(Q2_DIR, "agents_db.json"), "r") as f:
+        return json.load(f)
+
+@pytest.fixture
+def mock_server():
+    """Start a mock server with the given MockOptions; returns an OpenAI client for it."""
+    from openai import OpenAI
+    servers = []
+
+    def start(options):
+        server, base_url = start_mock_server(options=options)
+        servers.append(server)
+        return OpenAI(base_url=base_url, api_key="test", max_retries=0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
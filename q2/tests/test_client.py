@@ -0,0 +1,39 @@
+"""Lazy, shared OpenAI client of recommendation_engine."""
+import subprocess
+import sys
+
+import pytest
+
+import recommendation_engine
+from conftest import Q2_DIR
+from mock_openai_server import MockOptions
+from request_strategy import RecommendationError, RequestStrategy
+
+def test_import_does_not_load_the_sdk():
+    code = "import sys, recommendation_engine; print('openai' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=Q2_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+def test_client_needs_an_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(recommendation_engine, "_client", None)
+    with pytest.raises(RecommendationError) as error:
+        recommendation_engine.get_client()
+    assert error.value.attempts == []
+
+def test_client_is_created_once(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(recommendation_engine, "_client", None)
+    client = recommendation_engine.get_client()
+    assert recommendation_engine.get_client() is client
+
+def test_recommend_agents_with_given_client(mock_server, monkeypatch):
+    client = mock_server(MockOptions(latency=0.0, jitter=0.0))
+    monkeypatch.chdir(Q2_DIR)
+    # No API key is needed when the caller passes its own client
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(recommendation_engine, "_client", None)
+    text = recommendation_engine.recommend_agents("Write AWS Lambda handlers in Python", RequestStrategy(), client=client)
+
+    assert text.startswith("1. ")
+    assert recommendation_engine._client is None
@@ -0,0 +1,47 @@
+"""Stable prompt prefix and prompt-cache accounting."""
+from mock_openai_server import CACHE_BLOCK_TOKENS, MockOptions
+from prompt_cache import PrefixTracker, cached_tokens, common_prefix_length, estimate_tokens
+from recommendation_engine import llm_messages
+from request_strategy import RequestStrategy
+
+TASK = "Refactor a large codebase and navigate references in the editor"
+OTHER_TASK = "Write AWS Lambda handlers in Python"
+
+def test_common_prefix_length():
+    assert common_prefix_length("abcdef", "abcxyz") == 3
+    assert common_prefix_length("abc", "abcdef") == 3
+    assert common_prefix_length("", "abc") == 0
+    assert common_prefix_length("xbc", "abc") == 0
+
+def test_task_comes_after_the_whole_catalog(agents):
+    first, second = llm_messages(TASK, agents), llm_messages(OTHER_TASK, agents)
+    assert first[0] == second[0]
+    assert TASK not in first[0]["content"]
+    assert first[-1]["content"].endswith(TASK)
+
+def test_prefix_tracker_counts_the_shared_catalog(agents):
+    tracker = PrefixTracker()
+    prompt, shared = tracker.observe(llm_messages(TASK, agents))
+    assert shared == 0
+    prompt, shared = tracker.observe(llm_messages(OTHER_TASK, agents))
+    assert estimate_tokens(llm_messages(OTHER_TASK, agents)[0]["content"]) < shared < prompt
+    assert tracker.stats()["requests"] == 2
+
+def test_catalog_prefix_is_cached_across_tasks(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.0, jitter=0.0, cache_min_tokens=256))
+    strategy = RequestStrategy(models=["gpt-4"])
+    first = strategy.run(client, llm_messages(TASK, agents), agents).response
+    second = strategy.run(client, llm_messages(OTHER_TASK, agents), agents).response
+
+    assert cached_tokens(first) == 0
+    assert cached_tokens(second) >= CACHE_BLOCK_TOKENS
+    assert cached_tokens(second) % CACHE_BLOCK_TOKENS == 0
+    assert cached_tokens(second) < second.usage.prompt_tokens
+
+def test_prefix_below_minimum_is_not_cached(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.0, jitter=0.0))
+    strategy = RequestStrategy(models=["gpt-4"])
+    strategy.run(client, llm_messages(TASK, agents), agents)
+    second = strategy.run(client, llm_messages(OTHER_TASK, agents), agents).response
+
+    assert cached_tokens(second) == 0
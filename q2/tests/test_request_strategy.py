@@ -0,0 +1,75 @@
+"""Hedged and tiered request strategies against the mock server."""
+import threading
+import time
+
+import pytest
+
+from mock_openai_server import MockOptions
+from recommendation_engine import llm_messages
+from request_strategy import RecommendationError, RequestStrategy, parse_recommendations
+
+TASK = "Refactor a large codebase and navigate references in the editor"
+
+def request_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "q2-request"]
+
+def test_parse_recommendations_keeps_known_agents_in_order(agents):
+    text = "1. Cursor - editor\n2) cursor again\nSome prose about GitHub Copilot\n3. GitHub Copilot - completions"
+    assert parse_recommendations(text, agents) == ["Cursor", "GitHub Copilot"]
+
+def test_hedge_answers_when_first_request_stalls(mock_server, agents):
+    options = MockOptions(latency=0.02, jitter=0.0, stall_rate=1.0, stall_seconds=5.0)
+    client = mock_server(options)
+
+    def stop_stalling():
+        # Only the first request stalls: the hedge is drawn after this
+        while options.requests < 1:
+            time.sleep(0.005)
+        options.stall_rate = 0.0
+
+    threading.Thread(target=stop_stalling, daemon=True).start()
+    strategy = RequestStrategy(models=["gpt-4"], attempt_timeout=3.0, hedge_delay=0.1)
+    start = time.perf_counter()
+    result = strategy.run(client, llm_messages(TASK, agents), agents)
+
+    assert time.perf_counter() - start < 1.0
+    assert result.valid
+    assert [(attempt["hedge"], attempt["outcome"]) for attempt in result.attempts] == [(True, "answered")]
+    assert options.requests == 2
+
+def test_stalled_attempts_end_at_the_model_deadline(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.02, jitter=0.0, stall_rate=1.0, stall_seconds=5.0))
+    strategy = RequestStrategy(models=["gpt-4"], attempt_timeout=0.5, hedge_delay=0.3)
+    earlier = set(request_threads())
+    start = time.perf_counter()
+    with pytest.raises(RecommendationError) as error:
+        strategy.run(client, llm_messages(TASK, agents), agents)
+
+    # The model gets 0.5 s in all; the hedge only what was left of it, so neither request outlives that
+    assert time.perf_counter() - start < 0.7
+    assert [(attempt["hedge"], attempt["outcome"]) for attempt in error.value.attempts] == [
+        (False, "timeout"), (True, "timeout")]
+    time.sleep(0.1)
+    assert not set(request_threads()) - earlier
+
+def test_tiered_escalates_past_invalid_answers(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.02, jitter=0.0, invalid_models={"gpt-4o-mini"}))
+    result = RequestStrategy(models=["gpt-4o-mini", "gpt-4"]).run(client, llm_messages(TASK, agents), agents)
+
+    assert result.model == "gpt-4"
+    assert result.valid
+    assert [attempt["model"] for attempt in result.attempts] == ["gpt-4o-mini", "gpt-4"]
+
+def test_tiered_stops_at_first_valid_answer(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.02, jitter=0.0, invalid_models={"gpt-4"}))
+    result = RequestStrategy(models=["gpt-4o-mini", "gpt-4"]).run(client, llm_messages(TASK, agents), agents)
+
+    assert result.model == "gpt-4o-mini"
+    assert [attempt["model"] for attempt in result.attempts] == ["gpt-4o-mini"]
+
+def test_last_model_answer_is_returned_even_if_invalid(mock_server, agents):
+    client = mock_server(MockOptions(latency=0.02, jitter=0.0, invalid_models={"gpt-4o-mini", "gpt-4"}))
+    result = RequestStrategy(models=["gpt-4o-mini", "gpt-4"]).run(client, llm_messages(TASK, agents), agents)
+
+    assert result.model == "gpt-4"
+    assert not result.valid
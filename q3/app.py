@@ -1,124 +1,537 @@
-from flask import Flask, render_template, request, jsonify
-import json
-import os
-from optimizers.base_optimizer import BaseOptimizer
-from optimizers.copilot_optimizer import CopilotOptimizer
-from optimizers.cursor_optimizer import CursorOptimizer
-from optimizers.replit_optimizer import ReplitOptimizer
-from optimizers.codewhisperer_optimizer import CodeWhispererOptimizer
-from optimizers.claude_optimizer import ClaudeOptimizer
-from optimizers.gpt_optimizer import GPTOptimizer
-from prompt_analyzer import PromptAnalyzer
-
-app = Flask(__name__)
-
-# Initialize optimizers
-optimizers = {
-    'copilot': CopilotOptimizer(),
-    'cursor': CursorOptimizer(),
-    'replit': ReplitOptimizer(),
-    'codewhisperer': CodeWhispererOptimizer(),
-    'claude': ClaudeOptimizer(),
-    'gpt': GPTOptimizer()
-}
-
-# Initialize prompt analyzer
-analyzer = PromptAnalyzer()
-
-# Load tool analysis data
-def load_tool_analysis():
-    try:
-        with open('tool_analysis.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-tool_analysis = load_tool_analysis()
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/optimize', methods=['POST'])
-def optimize_prompt():
-    try:
-        data = request.get_json()
-        base_prompt = data.get('prompt', '')
-        target_tool = data.get('tool', '')
-        
-        if not base_prompt or not target_tool:
-            return jsonify({'error': 'Missing prompt or tool selection'}), 400
-        
-        if target_tool not in optimizers:
-            return jsonify({'error': 'Unsupported tool selected'}), 400
-        
-        # Analyze the base prompt
-        analysis = analyzer.analyze_prompt(base_prompt)
-        
-        # Optimize the prompt for the selected tool
-        optimizer = optimizers[target_tool]
-        optimized_prompt = optimizer.optimize(base_prompt, analysis)
-        
-        # Get optimization explanation
-        explanation = optimizer.get_explanation()
-        
-        return jsonify({
-            'original_prompt': base_prompt,
-            'optimized_prompt': optimized_prompt,
-            'analysis': analysis,
-            'explanation': explanation,
-            'tool': target_tool
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/tools')
-def get_tools():
-    tools = [
-        {
-            'id': 'copilot',
-            'name': 'GitHub Copilot',
-            'description': 'AI pair programmer for code completion and generation',
-            'icon': '🤖'
-        },
-        {
-            'id': 'cursor',
-            'name': 'Cursor',
-            'description': 'AI-first code editor with advanced code generation',
-            'icon': '📝'
-        },
-        {
-            'id': 'replit',
-            'name': 'Replit',
-            'description': 'Online IDE with AI-powered code assistance',
-            'icon': '🌐'
-        },
-        {
-            'id': 'codewhisperer',
-            'name': 'Amazon CodeWhisperer',
-            'description': 'AI-powered code generator for AWS development',
-            'icon': '☁️'
-        },
-        {
-            'id': 'claude',
-            'name': 'Claude (Anthropic)',
-            'description': 'Advanced AI assistant for coding and analysis',
-            'icon': '🧠'
-        },
-        {
-            'id': 'gpt',
-            'name': 'GPT-4 (OpenAI)',
-            'description': 'Large language model for code generation and review',
-            'icon': '⚡'
-        }
-    ]
-    return jsonify(tools)
-
-@app.route('/tool_details')
-def get_tool_details():
-    """Return detailed tool information from tool_analysis.json"""
-    return jsonify(tool_analysis)
-
-if __name__ == '__main__':
+from flask import Flask, render_template, request, jsonify
+import json
+import os
+import tempfile
+import time
+from optimizers.base_optimizer import BaseOptimizer
+from optimizers.registry import OptimizerRegistry
+from prompt_analyzer import PromptAnalyzer
+from result_cache import ResultCache
+from precomputed_response import PrecomputedResponse
+from profile_metrics import ProfileMetrics
+from streaming import BodyTooLargeError, SpooledPromptDocument, spool_text
+from live_session import LiveSession, LiveSessionStore
+from single_flight import CoalescedCallTimeout, SingleFlight
+from response_format import FastJSONProvider, ResponseFormat
+from jobs import JobRunner, JobStore, JobTooLargeError
+from tool_search import ToolSearchIndex
+
+app = Flask(__name__)
+# Encode JSON with orjson when it is installed
+app.json = FastJSONProvider(app)
+
+# Optimizers are listed in optimizers/manifest.json and imported on first use
+optimizers = OptimizerRegistry.from_manifests()
+
+# Initialize prompt analyzer
+analyzer = PromptAnalyzer()
+
+# Cache of serialized /optimize responses (set OPTIMIZE_CACHE_DB to keep them across restarts)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('OPTIMIZE_CACHE_ENTRIES', 256)),
+    max_bytes=int(os.environ.get('OPTIMIZE_CACHE_BYTES', 32 * 1024 * 1024)),
+    db_path=os.environ.get('OPTIMIZE_CACHE_DB') or None
+)
+
+# Concurrent cache misses for the same prompt/tool share one computation (e.g. during retry storms)
+single_flight = SingleFlight(timeout=float(os.environ.get('Q3_COALESCE_TIMEOUT', 30)))
+
+# Rule-set version per tool; part of the cache key so edited rules never serve stale results
+rules_versions = {}
+
+def get_rules_version(tool):
+    version = rules_versions.get(tool)
+    if version is None:
+        version = f"{tool}:{analyzer.get_rules_version()}-{optimizers[tool].get_rules_version()}"
+        rules_versions[tool] = version
+        result_cache.purge_stale(version, f"{tool}:")
+    return version
+
+# Aggregate per-rule timings of profiled /optimize requests, served at /metrics; with Q3_METRICS_DB set
+# (gunicorn.conf.py sets it) they are shared by every worker, otherwise they cover this process only
+profile_metrics = ProfileMetrics(os.environ.get('Q3_METRICS_DB') or None)
+
+# Load tool analysis data (relative to this file, so it works from any working directory)
+TOOL_ANALYSIS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tool_analysis.json')
+
+def load_tool_analysis():
+    try:
+        with open(TOOL_ANALYSIS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        app.logger.warning("Tool analysis file not found: %s", TOOL_ANALYSIS_PATH)
+        return {}
+
+tool_analysis = load_tool_analysis()
+
+# Inverted index over the tool descriptions, served by /tools/search
+tool_index = ToolSearchIndex(tool_analysis)
+SEARCH_LIMIT_MAX = 50
+
+
+# /tools and /tool_details never change while the app runs: encode and gzip them once
+STATIC_MAX_AGE = int(os.environ.get('Q3_STATIC_MAX_AGE', 86400))
+tools_response = PrecomputedResponse(optimizers.metadata(), app.json.dumps, STATIC_MAX_AGE)
+tool_details_response = PrecomputedResponse(tool_analysis, app.json.dumps, STATIC_MAX_AGE)
+# Per-tool capabilities, referenced by /optimize responses with "capabilities": "ref"; built on first request
+capabilities_responses = {}
+
+# Large prompts posted to /optimize/stream are spooled to disk and processed in chunks of this size
+STREAM_MAX_BYTES = int(os.environ.get('Q3_STREAM_MAX_BYTES', 64 * 1024 * 1024))
+STREAM_CHUNK_BYTES = int(os.environ.get('Q3_STREAM_CHUNK_BYTES', 64 * 1024))
+
+# Live-preview sessions of the web interface; each keeps its prompt in this process's memory
+live_sessions = LiveSessionStore(
+    max_sessions=int(os.environ.get('Q3_LIVE_SESSIONS', 256)),
+    ttl=int(os.environ.get('Q3_LIVE_TTL', 600)),
+    max_chars=int(os.environ.get('Q3_LIVE_MAX_TOTAL_CHARS', 32 * 1024 * 1024))
+)
+LIVE_MAX_CHARS = int(os.environ.get('Q3_LIVE_MAX_CHARS', 256 * 1024))
+
+# Batch jobs posted to /jobs are stored in SQLite and run in the background by low-priority worker processes.
+# The default database lives in the temp directory so that running the app never writes into the source tree.
+job_store = JobStore(os.environ.get('Q3_JOB_DB') or os.path.join(tempfile.gettempdir(), 'q3-jobs.db'))
+job_runner = JobRunner(
+    job_store,
+    concurrency=int(os.environ.get('Q3_JOB_CONCURRENCY', 1)),
+    chunk_size=int(os.environ.get('Q3_JOB_CHUNK', 100)),
+    nice=int(os.environ.get('Q3_JOB_NICE', 10)),
+    retention=float(os.environ.get('Q3_JOB_RETENTION', 7 * 86400))
+)
+JOB_MAX_PROMPTS = int(os.environ.get('Q3_JOB_MAX_PROMPTS', 1_000_000))
+JOB_PAGE_MAX = 1000
+
+def is_enabled(value):
+    return (value or '').lower() in ('1', 'true', 'yes', 'on')
+
+def run_optimization(base_prompt, target_tool, profile=False, full_analysis=True, response_format=None):
+    """
+    Analyze and optimize a prompt and return the serialized /optimize response.
+    With profile=True the explanation also carries analyzer and per-rule
+    timings, which are fed into the /metrics histograms. With
+    full_analysis=False the response only lists (and the analyzer only
+    computes) the features the tool's optimizer reads. response_format
+    selects the fields and representation of the response.
+    """
+    start_ns = time.perf_counter_ns()
+    optimizer = optimizers[target_tool]
+    
+    # Analyze the base prompt; features are computed when first read
+    analysis = analyzer.analyze_prompt(base_prompt)
+    if profile:
+        # Evaluate the optimizer's features up front so they count as analyzer time
+        analysis.to_dict(optimizer.FEATURES)
+    analyzed_ns = time.perf_counter_ns()
+    
+    # Optimize the prompt for the selected tool
+    optimization = optimizer.optimize(base_prompt, analysis)
+    optimized_prompt = optimization.prompt
+    optimized_ns = time.perf_counter_ns()
+    
+    # Get optimization explanation
+    explanation = optimization.get_explanation()
+    
+    if profile:
+        steps = optimization.get_profile()
+        explanation['profile'] = {
+            'analyzer_ns': analyzed_ns - start_ns,
+            'optimize_ns': optimized_ns - analyzed_ns,
+            'prompt_bytes': len(base_prompt.encode('utf-8')),
+            'steps': steps
+        }
+        profile_metrics.record(target_tool, analyzed_ns - start_ns, optimized_ns - analyzed_ns, steps)
+    
+    response_format = response_format or ResponseFormat()
+    return app.json.encode(response_format.build(
+        base_prompt, optimized_prompt, analysis, explanation, target_tool,
+        None if full_analysis else optimizer.FEATURES
+    )) + b'\n'
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/optimize', methods=['POST'])
+def optimize_prompt():
+    try:
+        data = request.get_json()
+        base_prompt = data.get('prompt', '')
+        target_tool = data.get('tool', '')
+        
+        if not base_prompt or not target_tool:
+            return jsonify({'error': 'Missing prompt or tool selection'}), 400
+        
+        if target_tool not in optimizers:
+            return jsonify({'error': 'Unsupported tool selected'}), 400
+        
+        # "analysis": "used" limits the analysis to the features the optimizer reads
+        analysis_mode = data.get('analysis', 'full')
+        if analysis_mode not in ('full', 'used'):
+            return jsonify({'error': 'analysis must be "full" or "used"'}), 400
+        full_analysis = analysis_mode == 'full'
+        
+        # "fields", "format": "diff" and "capabilities": "ref" shrink the response
+        try:
+            response_format = ResponseFormat.from_request(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Profiled requests (?profile=1 or X-Profile: 1) always run the full path and bypass the cache
+        if is_enabled(request.args.get('profile')) or is_enabled(request.headers.get('X-Profile')):
+            response = app.response_class(run_optimization(base_prompt, target_tool, True, full_analysis, response_format),
+                                          mimetype=app.json.mimetype)
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        
+        # Identical prompt/tool/rules always produce the same response, so it doubles as the ETag
+        rules_version = get_rules_version(target_tool)
+        variant = ('' if full_analysis else ':used') + response_format.key
+        cache_key = ResultCache.make_key(base_prompt, target_tool, rules_version + variant)
+        if request.if_none_match.contains(cache_key):
+            response = app.response_class(status=304)
+            response.set_etag(cache_key)
+            return response
+        
+        body = result_cache.get(cache_key)
+        cache_status = 'HIT'
+        if body is None:
+            def compute():
+                # A call for this key may have finished and cached its result between the lookup above
+                # and becoming the leader here, so look again before optimizing
+                cached = result_cache.get(cache_key, count=False)
+                if cached is not None:
+                    return cached, 'HIT'
+                computed = run_optimization(base_prompt, target_tool, full_analysis=full_analysis, response_format=response_format)
+                result_cache.put(cache_key, computed, rules_version)
+                return computed, 'MISS'
+            (body, cache_status), shared = single_flight.do(cache_key, compute)
+            if shared:
+                cache_status = 'COALESCED'
+        
+        response = app.response_class(body, mimetype=app.json.mimetype)
+        response.set_etag(cache_key)
+        response.headers['X-Cache'] = cache_status
+        return response
+        
+    except CoalescedCallTimeout as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/optimize/stream', methods=['POST'])
+def optimize_prompt_stream():
+    """
+    Optimize a large prompt sent as the raw UTF-8 request body (?tool=<id>).
+    The body is spooled to a temporary file while it is analyzed chunk by
+    chunk, and the optimized prompt is streamed back as text/plain. The
+    analysis, optimization steps and token estimate are returned in the
+    X-Prompt-Analysis, X-Optimization-Steps and X-Token-Usage headers.
+    """
+    target_tool = request.args.get('tool', '')
+    if target_tool not in optimizers:
+        return jsonify({'error': 'Missing or unsupported tool selection'}), 400
+    if request.content_length is not None and request.content_length > STREAM_MAX_BYTES:
+        return jsonify({'error': f'Prompt exceeds the {STREAM_MAX_BYTES} byte limit'}), 413
+    
+    spool = tempfile.TemporaryFile()
+    try:
+        length = 0
+        def chunks():
+            nonlocal length
+            for chunk in spool_text(request.stream, spool, STREAM_MAX_BYTES, STREAM_CHUNK_BYTES):
+                length += len(chunk)
+                yield chunk
+        analysis = analyzer.analyze_chunks(chunks())
+        if not length:
+            spool.close()
+            return jsonify({'error': 'Missing prompt or tool selection'}), 400
+        
+        optimizer = optimizers[target_tool]
+        document = SpooledPromptDocument(spool, length, STREAM_CHUNK_BYTES)
+        explanation = optimizer.optimize_document(document, analysis).get_explanation()
+    except BodyTooLargeError as e:
+        spool.close()
+        return jsonify({'error': str(e)}), 413
+    except UnicodeDecodeError:
+        spool.close()
+        return jsonify({'error': 'Prompt is not valid UTF-8'}), 400
+    except Exception as e:
+        spool.close()
+        return jsonify({'error': str(e)}), 500
+    
+    def generate():
+        try:
+            for text in document.iter_render():
+                yield text.encode('utf-8')
+        finally:
+            spool.close()
+    
+    response = app.response_class(generate(), mimetype='text/plain')
+    response.headers['X-Prompt-Analysis'] = app.json.dumps(analysis.to_dict(), ensure_ascii=True)
+    response.headers['X-Optimization-Steps'] = app.json.dumps(explanation['steps'], ensure_ascii=True)
+    response.headers['X-Token-Usage'] = app.json.dumps(explanation['tokens'], ensure_ascii=True)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def live_response(result, start_ns, session_id=None):
+    if session_id is not None:
+        result['session'] = session_id
+    response = jsonify(result)
+    response.headers['Server-Timing'] = f'optimize;dur={(time.perf_counter_ns() - start_ns) / 1e6:.2f}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/live', methods=['POST'])
+def start_live_session():
+    """
+    Start a live-preview session for a prompt and tool.
+    Returns the session id and the full optimized prompt as a patch
+    against the empty string.
+    """
+    start_ns = time.perf_counter_ns()
+    data = request.get_json(silent=True) or {}
+    base_prompt = data.get('prompt', '')
+    target_tool = data.get('tool', '')
+    if target_tool not in optimizers:
+        return jsonify({'error': 'Missing or unsupported tool selection'}), 400
+    if len(base_prompt) > LIVE_MAX_CHARS:
+        return jsonify({'error': f'Prompt exceeds the {LIVE_MAX_CHARS} character live preview limit'}), 413
+    
+    session = LiveSession(analyzer, target_tool, base_prompt)
+    with session.lock:
+        result = session.update([], optimizers[target_tool])
+    return live_response(result, start_ns, live_sessions.add(session))
+
+@app.route('/live/<session_id>', methods=['POST'])
+def update_live_session(session_id):
+    """
+    Apply edits to a live-preview session.
+    The body carries the session version the edits are based on, a list of
+    {start, delete, insert} edits against that version and optionally a new
+    tool. The response holds a patch against the previous optimized prompt,
+    plus the analysis and explanation only when they changed. 404 (unknown
+    or expired session, e.g. served by another worker) and 409 (version
+    mismatch) tell the client to start a new session with the full prompt.
+    """
+    start_ns = time.perf_counter_ns()
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired live session'}), 404
+    data = request.get_json(silent=True) or {}
+    edits = data.get('edits', [])
+    target_tool = data.get('tool', session.tool)
+    if target_tool not in optimizers:
+        return jsonify({'error': 'Unsupported tool selected'}), 400
+    
+    with session.lock:
+        if data.get('version') != session.version:
+            return jsonify({'error': 'Live session is out of sync', 'version': session.version}), 409
+        try:
+            growth = sum(len(str(edit.get('insert', ''))) - int(edit.get('delete', 0)) for edit in edits)
+            if len(session.text) + growth > LIVE_MAX_CHARS:
+                return jsonify({'error': f'Prompt exceeds the {LIVE_MAX_CHARS} character live preview limit'}), 413
+            session.tool = target_tool
+            result = session.update(edits, optimizers[target_tool])
+        except (AttributeError, TypeError, ValueError) as e:
+            live_sessions.remove(session_id)
+            return jsonify({'error': str(e)}), 400
+    live_sessions.fit(session_id)
+    return live_response(result, start_ns)
+
+@app.route('/live/<session_id>', methods=['DELETE'])
+def end_live_session(session_id):
+    live_sessions.remove(session_id)
+    return '', 204
+
+def job_entries():
+    """
+    Read the entries of a POST /jobs body as JSON strings: either a JSON
+    object with a "prompts" list, or JSON Lines streamed line by line.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        for line in request.stream:
+            line = line.decode('utf-8').strip()
+            if line:
+                yield line
+        return
+    for entry in (request.get_json(silent=True) or {}).get('prompts') or []:
+        yield json.dumps(entry, ensure_ascii=False)
+
+def job_status(job):
+    elapsed = ((job['finished'] or time.time()) - job['started']) if job['started'] else 0.0
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'tools': job['tools'],
+        'total': job['total'],
+        'processed': job['processed'],
+        'errors': job['errors'],
+        'progress': job['processed'] / job['total'] if job['total'] else 1.0,
+        'prompts_per_second': job['processed'] / elapsed if elapsed else 0.0,
+        'created': job['created'],
+        'started': job['started'],
+        'finished': job['finished'],
+        'error': job['error']
+    }
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a batch of prompts for background optimization.
+    The body is JSON ({"prompts": [...], "tools": [...], "with_analysis": false})
+    or JSON Lines (Content-Type: application/x-ndjson) with tools and
+    with_analysis in the query string. Each prompt is a string or an object
+    with "prompt" and an optional "id". Returns 202 with the job id.
+    """
+    data = request.get_json(silent=True) if request.is_json else None
+    options = data if isinstance(data, dict) else request.args
+    tools = options.get('tools') or optimizers.ids()
+    if isinstance(tools, str):
+        tools = [tool for tool in tools.split(',') if tool]
+    if not isinstance(tools, list) or not all(isinstance(tool, str) and tool in optimizers for tool in tools):
+        return jsonify({'error': 'Unsupported tool selected'}), 400
+    with_analysis = options.get('with_analysis', False)
+    with_analysis = is_enabled(with_analysis) if isinstance(with_analysis, str) else bool(with_analysis)
+    
+    try:
+        job_id = job_store.create(job_entries(), tools, with_analysis, JOB_MAX_PROMPTS)
+    except JobTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Body is not valid UTF-8'}), 400
+    job = job_store.get(job_id)
+    if not job['total']:
+        job_store.delete(job_id)
+        return jsonify({'error': 'Missing prompts'}), 400
+    
+    job_runner.start()
+    job_runner.wake()
+    response = jsonify(job_status(job))
+    response.status_code = 202
+    response.headers['Location'] = f'/jobs/{job_id}'
+    return response
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """
+    Return a job's progress and a page of its results (?offset=0&limit=100).
+    Results appear as they are processed, in submission order, each with
+    the index of its prompt. next_offset is where the next page starts,
+    and null once every result the job will produce has been returned.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(JOB_PAGE_MAX, max(0, request.args.get('limit', 100, type=int)))
+    results = job_store.results(job_id, offset, limit) if limit else []
+    status = job_status(job)
+    status['offset'] = offset
+    status['results'] = [json.loads(result) for result in results]
+    next_offset = offset + len(results)
+    more = job['status'] not in ('done', 'failed') or next_offset < job['processed']
+    status['next_offset'] = next_offset if more and next_offset < job['total'] else None
+    response = jsonify(status)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Cancel a job and delete its results"""
+    if not job_store.delete(job_id):
+        return jsonify({'error': 'Unknown job'}), 404
+    return '', 204
+
+@app.route('/tools')
+def get_tools():
+    return tools_response.to_response(request, app.response_class)
+
+@app.route('/tools/search')
+def search_tools():
+    """Return the tools whose tool_analysis.json entries best match q, with the matching entries"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing query'}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= SEARCH_LIMIT_MAX:
+        return jsonify({'error': f'limit must be between 1 and {SEARCH_LIMIT_MAX}'}), 400
+    response = jsonify({'query': query, 'results': tool_index.search(query, limit)})
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    return response
+
+@app.route('/tools/<tool_id>/capabilities')
+def get_tool_capabilities(tool_id):
+    """Return an optimizer's capabilities, as referenced by explanation.capabilities_url"""
+    if tool_id not in optimizers:
+        return jsonify({'error': 'Unsupported tool selected'}), 404
+    response = capabilities_responses.get(tool_id)
+    if response is None:
+        response = capabilities_responses[tool_id] = PrecomputedResponse(
+            optimizers[tool_id].capabilities(), app.json.dumps, STATIC_MAX_AGE)
+    return response.to_response(request, app.response_class)
+
+@app.route('/cache_stats')
+def get_cache_stats():
+    """Return hit/miss counters for the /optimize result cache and request coalescing"""
+    stats = result_cache.stats()
+    stats['coalescing'] = single_flight.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def get_metrics():
+    """Return latency histograms collected from profiled /optimize requests"""
+    response = jsonify(profile_metrics.snapshot())
+    # Without a shared database the histograms only cover the worker that answered
+    response.headers['X-Metrics-Scope'] = 'all-workers' if profile_metrics.db_path else f'pid {os.getpid()}'
+    return response
+
+@app.route('/tool_details')
+def get_tool_details():
+    """Return detailed tool information from tool_analysis.json"""
+    return tool_details_response.to_response(request, app.response_class)
+
+@app.route('/healthz')
+def healthz():
+    """Health check for load balancers and the production server"""
+    healthy = bool(tool_analysis)
+    return jsonify({
+        'status': 'ok' if healthy else 'degraded',
+        'tools': sorted(optimizers),
+        'loaded_optimizers': optimizers.loaded(),
+        'tool_analysis_loaded': healthy
+    }), 200 if healthy else 503
+
+def create_app(config=None):
+    """
+    WSGI factory for production servers (see gunicorn.conf.py).
+    The analyzer and tool_analysis.json are loaded when this module is
+    imported; calling the factory in the master process before forking also
+    compiles the page template and instantiates the optimizers listed in
+    Q3_PRELOAD_OPTIMIZERS (comma-separated ids; by default 'all', every
+    optimizer in the manifests), so workers share them copy-on-write and
+    gunicorn's gc.freeze covers them. Other optimizers ('none' preloads
+    nothing) are loaded by each worker on first use.
+    """
+    if config:
+        app.config.update(config)
+    app.jinja_env.get_template('index.html')
+    preload = app.config.get('PRELOAD_OPTIMIZERS', os.environ.get('Q3_PRELOAD_OPTIMIZERS') or 'all')
+    if preload == 'all':
+        optimizers.load_all()
+        tools = optimizers.ids()
+    else:
+        tools = [tool for tool in preload.split(',') if tool and tool != 'none']
+    # Also purges each tool's stale entries from the SQLite result cache
+    for tool in tools:
+        get_rules_version(tool)
+    return app
+
+if __name__ == '__main__':
+    job_runner.start()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
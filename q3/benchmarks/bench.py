@@ -0,0 +1,416 @@
+"""
+Benchmarks for the Adaptive Prompt Optimizer.
+
+    python benchmarks/bench.py micro                  # analyzer + optimizers, per corpus prompt
+    python benchmarks/bench.py http -c 8 -n 1000      # end-to-end /optimize load test
+    python benchmarks/bench.py response               # /optimize response size and encoding time per format
+    python benchmarks/bench.py all --save results.json
+    python benchmarks/bench.py all --compare benchmarks/baseline.json
+
+With --compare the run exits with status 1 if any metric regressed by
+more than the threshold relative to the stored baseline. Every run also
+times a fixed set of calibration workloads, and timings are compared
+relative to them, so a baseline saved on one machine can be checked on
+another.
+"""
+from typing import Callable, Dict, Any, List, Tuple
+import argparse
+import gc
+import http.client
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+Q3_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Q3_DIR)
+
+from optimizers.registry import OptimizerRegistry
+from prompt_analyzer import PromptAnalyzer
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus.json')
+
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = ('ops_per_sec', 'req_per_sec')
+
+# Allowed relative regression. Three runs of unchanged code on the shared single-vCPU host
+# that saved baseline.json differed by up to 42% on single metrics (mostly under 25%), as the
+# whole process runs faster or slower there; validate a lower threshold before using it
+DEFAULT_THRESHOLD = 0.5
+
+def load_corpus(path: str = CORPUS_PATH, max_bytes: int = None) -> List[Tuple[str, str]]:
+    """
+    Load the benchmark prompts.
+    Scaled entries are built by concatenating the realistic prompts, in
+    order, until the target size is reached, so large inputs still contain
+    the keywords the analyzer and optimizers react to.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+    prompts = [(entry['name'], entry['prompt']) for entry in corpus['prompts']]
+    sources = [prompt for _, prompt in prompts]
+    for entry in corpus['scaled']:
+        if max_bytes is not None and entry['target_bytes'] > max_bytes:
+            continue
+        parts, size, i = [], 0, 0
+        while size < entry['target_bytes']:
+            part = sources[i % len(sources)]
+            parts.append(part)
+            size += len(part.encode('utf-8')) + 2
+            i += 1
+        # Cut on bytes, dropping a character split by the cut, so the size matches its name
+        text = '\n\n'.join(parts).encode('utf-8')[:entry['target_bytes']].decode('utf-8', 'ignore')
+        prompts.append((entry['name'], text))
+    return prompts
+
+def time_round(func, min_time: float) -> float:
+    """Seconds per call of func over a round of at least min_time seconds, with the garbage collector paused as in timeit."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        iterations, start = 0, time.perf_counter()
+        while True:
+            func()
+            iterations += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                return elapsed / iterations
+    finally:
+        if enabled:
+            gc.enable()
+
+def measure(cases: Dict[str, Callable], min_time: float, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Time every case in repeat rounds of at least min_time seconds and
+    report its median round, then trace the allocations of one extra call.
+    The rounds are interleaved, one round of every case and then the next,
+    so a slow spell of a shared machine costs each case one round rather
+    than all of them.
+    """
+    rounds = {name: [] for name in cases}
+    for func in cases.values():
+        func()
+    for _ in range(repeat):
+        for name, func in cases.items():
+            rounds[name].append(time_round(func, min_time))
+    results = {}
+    for name, func in cases.items():
+        per_op = statistics.median(rounds[name])
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+        results[name] = {
+            'ops_per_sec': 1 / per_op,
+            'us_per_op': per_op * 1e6,
+            'retained_blocks': sum(max(stat.count_diff, 0) for stat in stats),
+            'peak_kib': peak / 1024
+        }
+    return results
+
+# Fixed pure-Python workloads (string scanning, dict counting, sorting, regex, JSON, object
+# creation) like the analyzer's and optimizers'. Their speed on the current machine scales
+# the baseline's timings in compare(); several are used because any one of them varies
+# from run to run more than the benchmarks as a whole do.
+CALIBRATION_TEXT = ' '.join(f'Word{i % 97} the{i % 13}' for i in range(2000))
+CALIBRATION_RECORDS = [{'id': i, 'name': f'item{i}', 'tags': ['a', 'b', str(i % 7)], 'score': i * 0.5} for i in range(200)]
+CALIBRATION_PATTERN = re.compile(r'word(\d+)')
+
+class CalibrationPoint:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: int, y: int):
+        self.x, self.y = x, y
+
+def count_words():
+    counts = {}
+    for word in CALIBRATION_TEXT.lower().split():
+        counts[word] = counts.get(word, 0) + 1
+    return sorted(counts.items(), key=lambda item: item[1])
+
+def search_text():
+    return [CALIBRATION_TEXT.find(f'Word{i} ') for i in range(0, 97, 3)] + [CALIBRATION_TEXT.count('the1')]
+
+def scan_regex():
+    return sum(int(match.group(1)) for match in CALIBRATION_PATTERN.finditer(CALIBRATION_TEXT.lower()))
+
+def encode_json():
+    return json.dumps(CALIBRATION_RECORDS, sort_keys=True)
+
+def build_string():
+    return ''.join([f'{i}:{i * i};' for i in range(2000)])
+
+def create_objects():
+    return sum(point.x * point.y for point in [CalibrationPoint(i, i + 1) for i in range(1000)])
+
+CALIBRATION = {func.__name__: func for func in (count_words, search_text, scan_regex, encode_json, build_string, create_objects)}
+
+def calibration_speed(results: Dict[str, Any], baseline: Dict[str, Any]) -> float:
+    """How many times as fast as the baseline's machine this one ran the calibration workloads (geometric mean)."""
+    ratios = [metrics['ops_per_sec'] / baseline['calibration'][name]['ops_per_sec']
+              for name, metrics in results.get('calibration', {}).items() if name in baseline.get('calibration', {})]
+    return statistics.geometric_mean(ratios) if ratios else 1.0
+
+def micro_cases(prompts: List[Tuple[str, str]], tools: List[str]) -> Dict[str, Callable]:
+    """
+    The full PromptAnalyzer analysis and each optimizer's optimize on every
+    prompt. The analysis is materialized, so the optimizer numbers cover
+    the rules alone.
+    """
+    analyzer = PromptAnalyzer()
+    registry = OptimizerRegistry.from_manifests()
+    cases = {}
+    for name, prompt in prompts:
+        analysis = analyzer.analyze_prompt(prompt).to_dict()
+        cases[f'analyzer/{name}'] = lambda prompt=prompt: analyzer.analyze_prompt(prompt).to_dict()
+        for tool in tools:
+            optimizer = registry.get(tool)
+            cases[f'{tool}/{name}'] = lambda optimizer=optimizer, prompt=prompt, analysis=analysis: optimizer.optimize(prompt, analysis).prompt
+    return cases
+
+# /optimize request options compared by the response benchmark
+RESPONSE_VARIANTS = {
+    'full': {},
+    'compact': {'format': 'diff', 'capabilities': 'ref'},
+    'steps': {'fields': 'optimized_diff,explanation.steps'}
+}
+
+def response_cases(prompts: List[Tuple[str, str]], tool: str) -> Dict[str, Callable]:
+    """
+    Building and encoding an /optimize response body for every response
+    variant, with the standard library encoder and with orjson when it is
+    installed. Analysis and optimization happen up front, so only the
+    response itself is timed.
+    """
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from response_format import FastJSONProvider, ResponseFormat, orjson
+    app = Flask(__name__)
+    encoders = {'json': lambda obj: DefaultJSONProvider(app).dumps(obj).encode('utf-8')}
+    if orjson is not None:
+        encoders['orjson'] = FastJSONProvider(app).encode
+    analyzer = PromptAnalyzer()
+    optimizer = OptimizerRegistry.from_manifests().get(tool)
+    cases = {}
+    for name, prompt in prompts:
+        analysis = analyzer.analyze_prompt(prompt).to_dict()
+        optimization = optimizer.optimize(prompt, analysis)
+        optimized, explanation = optimization.prompt, optimization.get_explanation()
+        for variant, options in RESPONSE_VARIANTS.items():
+            response_format = ResponseFormat.from_request(options)
+            for encoder_name, encode in encoders.items():
+                def respond(encode=encode, response_format=response_format, prompt=prompt, optimized=optimized,
+                            analysis=analysis, explanation=explanation):
+                    return encode(response_format.build(prompt, optimized, analysis, explanation, tool))
+                cases[f'{variant}/{encoder_name}/{name}'] = respond
+    return cases
+
+def start_local_server() -> Tuple[str, Any]:
+    """Serve app.py on an ephemeral port in a background thread."""
+    from werkzeug.serving import make_server
+    from app import create_app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+def run_http(url: str, prompt: str, tool: str, concurrency: int, requests: int, unique: bool) -> Dict[str, float]:
+    """
+    Send requests to /optimize from a fixed number of keep-alive clients.
+    With unique=True every request carries a distinct prompt, so the
+    result cache never hits and the full analyze/optimize path is measured.
+    """
+    target = urlparse(url)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            body = json.dumps({'prompt': f'{prompt} #{n}' if unique else prompt, 'tool': tool})
+            start = time.perf_counter()
+            try:
+                connection.request('POST', '/optimize', body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+        connection.close()
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else float('nan')
+
+    return {
+        'req_per_sec': len(latencies) / wall,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'errors': errors[0]
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    List every metric that regressed by more than threshold against the
+    baseline. When both runs timed the calibration workloads, the
+    baseline's timings are first scaled by how much faster or slower this
+    machine ran them, so only changes relative to the machine's speed count.
+    """
+    speed = calibration_speed(results, baseline)
+    regressions = []
+    for section, benchmarks in baseline.items():
+        if section == 'calibration':
+            continue
+        for name, metrics in benchmarks.items():
+            current = results.get(section, {}).get(name)
+            if current is None:
+                continue
+            for metric, expected in metrics.items():
+                actual = current.get(metric)
+                if actual is None or not expected:
+                    continue
+                if metric in HIGHER_IS_BETTER:
+                    expected *= speed
+                    change = (expected - actual) / expected
+                elif metric.endswith('_ms'):
+                    expected /= speed
+                    change = (actual - expected) / expected
+                else:
+                    # us_per_op mirrors ops_per_sec; allocations and errors are reported, not gated
+                    continue
+                if change > threshold:
+                    regressions.append(f'{section}/{name} {metric}: {expected:.1f} -> {actual:.1f} ({change:.0%} worse)')
+    return regressions
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]):
+    print(f'\n{title}')
+    if not rows:
+        return
+    columns = list(next(iter(rows.values())))
+    width = max(len(name) for name in rows)
+    print(' ' * width + ''.join(f'{column:>14}' for column in columns))
+    for name, metrics in rows.items():
+        print(name.ljust(width) + ''.join(f'{metrics[column]:>14.1f}' for column in columns))
+
+def run_http_rounds(url: str, prompt: str, tools: List[str], concurrency: int, requests: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Run the HTTP benchmark for every tool, with unique and with repeated
+    prompts, repeat times over and report the median of each metric (and
+    the total of errors). Like measure(), one round of every combination
+    runs before the next.
+    """
+    rounds = {}
+    for _ in range(repeat):
+        for tool in tools:
+            for unique in (True, False):
+                name = f"{tool}/{'miss' if unique else 'hit'}"
+                rounds.setdefault(name, []).append(run_http(url, prompt, tool, concurrency, requests, unique))
+    return {
+        name: {metric: sum(run[metric] for run in runs) if metric == 'errors' else statistics.median(run[metric] for run in runs)
+               for metric in runs[0]}
+        for name, runs in rounds.items()
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the q3 analyzer, optimizers and /optimize endpoint')
+    parser.add_argument('mode', choices=['micro', 'http', 'response', 'all'])
+    parser.add_argument('--tools', default=','.join(OptimizerRegistry.from_manifests().ids()), help='comma-separated tool ids')
+    parser.add_argument('--max-bytes', type=int, default=None, help='skip corpus prompts larger than this')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timing round of each micro and response benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per benchmark (HTTP runs per tool); the median is reported')
+    parser.add_argument('--url', default=None, help='benchmark a running server instead of an in-process one')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-n', '--requests', type=int, default=1000, help='requests per HTTP run')
+    parser.add_argument('--http-prompt', default='todo_api', help='corpus prompt used for the HTTP benchmark')
+    parser.add_argument('--response-tool', default='copilot', help='tool whose responses the response benchmark encodes')
+    parser.add_argument('--save', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    tools = [tool for tool in args.tools.split(',') if tool]
+    prompts = load_corpus(max_bytes=args.max_bytes)
+
+    # The calibration workloads are timed in the same interleaved rounds as the benchmarks
+    cases = {f'calibration/{name}': func for name, func in CALIBRATION.items()}
+    if args.mode in ('micro', 'all'):
+        cases.update({f'micro/{name}': func for name, func in micro_cases(prompts, tools).items()})
+    if args.mode in ('response', 'all'):
+        cases.update({f'response/{name}': func for name, func in response_cases(prompts, args.response_tool).items()})
+    results = {}
+    for key, metrics in measure(cases, args.min_time, args.repeat).items():
+        section, name = key.split('/', 1)
+        if section == 'response':
+            metrics['bytes'] = len(cases[key]())
+        results.setdefault(section, {})[name] = metrics
+
+    if 'micro' in results:
+        print_table('Micro benchmarks', results['micro'])
+
+    if args.mode in ('http', 'all'):
+        url, server = (args.url, None) if args.url else start_local_server()
+        prompt = dict(prompts)[args.http_prompt]
+        results['http'] = run_http_rounds(url, prompt, tools, args.concurrency, args.requests, args.repeat)
+        if server is not None:
+            server.shutdown()
+        print_table(f'HTTP /optimize ({args.concurrency} concurrent clients, {args.requests} requests, median of {args.repeat} runs)',
+                    results['http'])
+
+    if 'response' in results:
+        print_table(f'/optimize responses ({args.response_tool})', results['response'])
+
+    print_table('Calibration workloads', results['calibration'])
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if 'calibration' in baseline:
+            print(f'\nThis machine runs the calibration workloads {calibration_speed(results, baseline):.2f}x as fast as '
+                  'the baseline\'s; baseline timings are scaled by that')
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print(f'\nNo regressions beyond {args.threshold:.0%}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Optimize a JSONL corpus of prompts offline, across processes.
+
+    python bulk_optimize.py prompts.jsonl -o optimized.jsonl
+    python bulk_optimize.py prompts.jsonl --tools claude,gpt --workers 8 --chunk-size 200
+    cat prompts.jsonl | python bulk_optimize.py - --with-analysis > optimized.jsonl
+
+Each input line is a JSON object with a "prompt" field (an "id" field is
+copied to the output) or a bare JSON string. Each output line holds, per
+selected tool, the optimized prompt, the optimization steps and the token
+estimate. Lines that cannot be processed produce {"line": n, "error": ...}.
+Output is written in input order.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+
+from optimizers.registry import OptimizerRegistry
+from prompt_analyzer import PromptAnalyzer
+
+# Set in every worker process by init_worker
+_analyzer = None
+_optimizers = None
+_with_analysis = False
+
+def init_worker(tools: List[str], with_analysis: bool):
+    """Build the analyzer and the selected optimizers once per worker process."""
+    global _analyzer, _optimizers, _with_analysis
+    registry = OptimizerRegistry.from_manifests()
+    _analyzer = PromptAnalyzer()
+    _optimizers = [(tool, registry.get(tool)) for tool in tools]
+    _with_analysis = with_analysis
+
+def optimize_entry(entry: Any, analyzer: PromptAnalyzer, optimizers: List[Tuple[str, Any]], with_analysis: bool) -> Dict[str, Any]:
+    """
+    Optimize one corpus entry, a {"prompt": ..., "id": ...} object or a bare
+    string, for every (tool, optimizer) pair. The prompt is analyzed once and
+    the lazy analysis is shared by all tools, so each feature is computed at
+    most once. Raises ValueError if the entry has no prompt.
+    """
+    if isinstance(entry, str):
+        entry = {'prompt': entry}
+    prompt = entry.get('prompt') if isinstance(entry, dict) else None
+    if not isinstance(prompt, str) or not prompt:
+        raise ValueError('Missing prompt')
+
+    analysis = analyzer.analyze_prompt(prompt)
+    result = {}
+    if 'id' in entry:
+        result['id'] = entry['id']
+    results = {}
+    for tool, optimizer in optimizers:
+        optimization = optimizer.optimize(prompt, analysis)
+        explanation = optimization.get_explanation()
+        results[tool] = {
+            'optimized_prompt': optimization.prompt,
+            'steps': explanation['steps'],
+            'tokens': explanation['tokens']
+        }
+    if with_analysis:
+        result['analysis'] = analysis.to_dict()
+    result['results'] = results
+    return result
+
+def optimize_line(number: int, line: str) -> Dict[str, Any]:
+    """Optimize one input line for every selected tool."""
+    try:
+        entry = json.loads(line)
+    except ValueError as e:
+        return {'line': number, 'error': f'Invalid JSON: {e}'}
+    try:
+        return {'line': number, **optimize_entry(entry, _analyzer, _optimizers, _with_analysis)}
+    except ValueError as e:
+        return {'line': number, 'error': str(e)}
+
+def optimize_chunk(chunk: List[Tuple[int, str]]) -> Tuple[str, int, int]:
+    """Process a chunk of input lines in a worker; returns the encoded output, line count and error count."""
+    lines, errors = [], 0
+    for number, line in chunk:
+        try:
+            result = optimize_line(number, line)
+        except Exception as e:
+            result = {'line': number, 'error': f'{type(e).__name__}: {e}'}
+        errors += 'error' in result
+        lines.append(json.dumps(result, ensure_ascii=False) + '\n')
+    return ''.join(lines), len(lines), errors
+
+def read_chunks(source, chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    """Group the non-blank lines of a file into numbered chunks."""
+    chunk = []
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        chunk.append((number, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class Progress:
+    """Periodic progress and throughput report on stderr."""
+
+    def __init__(self, interval: float, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self.start = self.last = time.perf_counter()
+        self.prompts = 0
+        self.errors = 0
+
+    def update(self, prompts: int, errors: int = 0):
+        self.prompts += prompts
+        self.errors += errors
+        now = time.perf_counter()
+        if self.interval and now - self.last >= self.interval:
+            self.last = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = time.perf_counter() - self.start
+        rate = self.prompts / elapsed if elapsed else 0.0
+        label = 'done' if final else 'progress'
+        print(f'{label}: {self.prompts} prompts, {self.errors} errors, {elapsed:.1f}s, {rate:.0f} prompts/s',
+              file=self.stream, flush=True)
+
+def run(source, output, tools: List[str], workers: int, chunk_size: int, with_analysis: bool,
+        progress: Progress, max_pending: Optional[int] = None) -> Progress:
+    """
+    Stream chunks from source through a process pool and write results in
+    input order. At most max_pending chunks (default 2 per worker) are read
+    ahead of the output, which bounds memory regardless of input size.
+    """
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(tools, with_analysis)) as pool:
+        for chunk in read_chunks(source, chunk_size):
+            pending.append(pool.submit(optimize_chunk, chunk))
+            while len(pending) >= max_pending:
+                write_result(pending.popleft().result(), output, progress)
+        while pending:
+            write_result(pending.popleft().result(), output, progress)
+    return progress
+
+def write_result(result: Tuple[str, int, int], output, progress: Progress):
+    text, count, errors = result
+    output.write(text)
+    progress.update(count, errors)
+
+def main(argv=None):
+    registry = OptimizerRegistry.from_manifests()
+    parser = argparse.ArgumentParser(description='Optimize a JSONL prompt corpus for one or more tools')
+    parser.add_argument('input', help="JSONL file of prompts, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file to write, or '-' for stdout")
+    parser.add_argument('--tools', default=','.join(registry.ids()), help='comma-separated tool ids (default: all)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=100, help='input lines sent to a worker at a time')
+    parser.add_argument('--with-analysis', action='store_true', help='include the full prompt analysis in each output line')
+    parser.add_argument('--progress', type=float, default=5.0, help='seconds between progress reports on stderr (0 to disable)')
+    args = parser.parse_args(argv)
+
+    tools = [tool for tool in args.tools.split(',') if tool]
+    unknown = [tool for tool in tools if tool not in registry]
+    if unknown or not tools:
+        parser.error(f"unknown tools: {', '.join(unknown)}" if unknown else 'no tools selected')
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        progress = run(source, output, tools, max(1, args.workers), max(1, args.chunk_size),
+                       args.with_analysis, Progress(args.progress))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    progress.report(final=True)
+    return 1 if progress.errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
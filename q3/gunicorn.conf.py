@@ -0,0 +1,56 @@
+# Production server configuration for the Adaptive Prompt Optimizer.
+# Run from any directory with: gunicorn -c q3/gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+import tempfile
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'app:create_app()'
+
+bind = os.environ.get('Q3_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('Q3_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads share the optimizers, which keep per-request state in the Optimization they return
+threads = int(os.environ.get('Q3_THREADS', 2))
+worker_class = 'gthread'
+
+# Build the analyzer, tool data and the optimizers (Q3_PRELOAD_OPTIMIZERS, all by default) once in the master, then fork
+preload_app = True
+
+# SIGTERM lets in-flight requests finish for up to graceful_timeout seconds
+graceful_timeout = int(os.environ.get('Q3_GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('Q3_TIMEOUT', 60))
+keepalive = 5
+
+# Workers add the histograms of profiled requests to one SQLite file, so /metrics covers all of them.
+# Unless Q3_METRICS_DB is set, it is a fresh file for every server run, removed on exit.
+metrics_db = None
+if not os.environ.get('Q3_METRICS_DB'):
+    metrics_db = os.environ['Q3_METRICS_DB'] = os.path.join(tempfile.gettempdir(), f'q3-metrics-{os.getpid()}.db')
+
+accesslog = os.environ.get('Q3_ACCESS_LOG', '-')
+errorlog = '-'
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and copy) the pages they share with the master
+    gc.collect()
+    gc.freeze()
+
+def post_worker_init(worker):
+    # Every worker runs the background job runner; the job database caps how many jobs run at once
+    from app import job_runner
+    job_runner.start()
+
+def worker_exit(server, worker):
+    from app import job_runner, job_store, profile_metrics, result_cache
+    job_runner.stop()
+    job_store.close()
+    result_cache.close()
+    profile_metrics.close()
+
+def on_exit(server):
+    if metrics_db:
+        for path in (metrics_db, metrics_db + '-wal', metrics_db + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,378 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from bulk_optimize import optimize_entry
+from optimizers.registry import OptimizerRegistry
+from prompt_analyzer import PromptAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Job states: receiving -> queued -> running -> done | failed
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    tools TEXT NOT NULL,
+    with_analysis INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    lease REAL,
+    owner TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+'''
+
+class JobTooLargeError(ValueError):
+    """Raised when a submitted batch exceeds the prompt limit."""
+
+class JobStore:
+    """
+    SQLite persistence for batch optimization jobs.
+    Each job row tracks its state and progress, and each submitted entry is
+    an item row that receives its result once processed, so progress and
+    results survive restarts. Items are processed in index order, which
+    makes the processed count the index of the next item to run. The
+    database may be shared by several processes; each opens its own
+    connection on first use.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork (e.g. gunicorn's preload), so reconnect per process
+        if self._db is None or self._pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def create(self, entries: Iterable[str], tools: List[str], with_analysis: bool,
+               max_items: int, batch_size: int = 1000) -> str:
+        """
+        Store a new job from JSON-encoded entries and queue it.
+        Entries are written in batches while they are read, so a large
+        upload never sits in memory or holds the write lock for long.
+        Raises JobTooLargeError once more than max_items entries are read.
+        """
+        job_id = uuid.uuid4().hex
+        with self._transaction() as db:
+            db.execute('INSERT INTO jobs (id, status, tools, with_analysis, created) VALUES (?, ?, ?, ?, ?)',
+                       (job_id, 'receiving', json.dumps(tools), int(with_analysis), time.time()))
+        total, batch = 0, []
+        try:
+            for entry in entries:
+                if total >= max_items:
+                    raise JobTooLargeError(f'Job exceeds the {max_items} prompt limit')
+                batch.append((job_id, total, entry))
+                total += 1
+                if len(batch) >= batch_size:
+                    self._insert_items(batch)
+                    batch = []
+            self._insert_items(batch)
+        except BaseException:
+            self.delete(job_id)
+            raise
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'queued', total = ? WHERE id = ?", (total, job_id))
+        return job_id
+
+    def _insert_items(self, batch: List[Tuple[str, int, str]]):
+        if batch:
+            with self._transaction() as db:
+                db.executemany('INSERT INTO items (job_id, idx, entry) VALUES (?, ?, ?)', batch)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's state and progress, or None if it does not exist."""
+        with self._lock:
+            row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['tools'] = json.loads(job['tools'])
+        job['with_analysis'] = bool(job['with_analysis'])
+        return job
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[str]:
+        """Return the JSON-encoded results of up to limit processed items, starting at index offset."""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT result FROM items WHERE job_id = ? AND idx >= ? AND result IS NOT NULL ORDER BY idx LIMIT ?',
+                (job_id, offset, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def claim(self, max_running: int, lease: float) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest queued job, unless max_running jobs are
+        already running across every process sharing the database. Jobs
+        whose lease has expired (their process died) are queued again first.
+        The returned job's owner token must be passed to every later update,
+        so a runner that lost its lease can no longer write to the job.
+        """
+        now = time.time()
+        owner = uuid.uuid4().hex
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'queued', lease = NULL, owner = NULL WHERE status = 'running' AND lease < ?", (now,))
+            running = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= max_running:
+                return None
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', lease = ?, owner = ?, started = COALESCE(started, ?) WHERE id = ?",
+                       (now + lease, owner, now, row[0]))
+        return self.get(row[0])
+
+    def pending_items(self, job_id: str, limit: int) -> List[Tuple[int, str]]:
+        """Return the next limit unprocessed (index, entry) pairs of a job."""
+        with self._lock:
+            rows = self._connection().execute(
+                'SELECT idx, entry FROM items WHERE job_id = ? AND idx >= (SELECT processed FROM jobs WHERE id = ?) '
+                'ORDER BY idx LIMIT ?', (job_id, job_id, limit)).fetchall()
+        return [(row[0], row[1]) for row in rows]
+
+    def renew(self, job_id: str, owner: str, lease: float) -> bool:
+        """Extend a running job's lease; False if it was deleted or claimed by another runner."""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                                (time.time() + lease, job_id, owner))
+            return cursor.rowcount > 0
+
+    def save_results(self, job_id: str, owner: str, results: List[Tuple[int, str, bool]], lease: float) -> bool:
+        """
+        Store the (index, result, failed) triples of a processed chunk and
+        advance the job's progress in one transaction. Returns False,
+        storing nothing, if the job was deleted or claimed by another runner.
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET processed = processed + ?, errors = errors + ?, lease = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (len(results), sum(failed for _, _, failed in results), time.time() + lease, job_id, owner))
+            if not cursor.rowcount:
+                return False
+            db.executemany('UPDATE items SET result = ? WHERE job_id = ? AND idx = ?',
+                           [(result, job_id, index) for index, result, _ in results])
+        return True
+
+    def finish(self, job_id: str, owner: str, status: str, error: Optional[str] = None):
+        """Mark a running job as done or failed."""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, finished = ?, lease = NULL, owner = NULL, error = ? "
+                       "WHERE id = ? AND owner = ? AND status = 'running'",
+                       (status, time.time(), error, job_id, owner))
+
+    def release(self, job_id: str, owner: str):
+        """Queue a running job again, e.g. when its process shuts down."""
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = 'queued', lease = NULL, owner = NULL WHERE id = ? AND owner = ? AND status = 'running'",
+                       (job_id, owner))
+
+    def delete(self, job_id: str) -> bool:
+        """Delete a job and its results; a running job stops after its current chunk."""
+        with self._transaction() as db:
+            db.execute('DELETE FROM items WHERE job_id = ?', (job_id,))
+            return db.execute('DELETE FROM jobs WHERE id = ?', (job_id,)).rowcount > 0
+
+    def purge(self, before: float) -> int:
+        """Delete finished jobs, and abandoned uploads, older than the given timestamp."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id FROM jobs WHERE (status IN ('done', 'failed') AND finished < ?) OR (status = 'receiving' AND created < ?)",
+                (before, before)).fetchall()
+        for row in rows:
+            self.delete(row[0])
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+# Set in every job worker process by init_job_worker
+_analyzer = None
+_registry = None
+
+def init_job_worker(nice: int):
+    """Lower the worker's CPU priority below the web workers and build the analyzer and registry."""
+    global _analyzer, _registry
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+    _analyzer = PromptAnalyzer()
+    _registry = OptimizerRegistry.from_manifests()
+
+def optimize_items(items: List[Tuple[int, str]], tools: List[str], with_analysis: bool) -> List[Tuple[int, str, bool]]:
+    """Optimize a chunk of (index, entry) pairs in a worker; returns (index, result, failed) triples."""
+    optimizers = [(tool, _registry.get(tool)) for tool in tools]
+    results = []
+    for index, entry in items:
+        try:
+            entry = json.loads(entry)
+        except ValueError as e:
+            results.append((index, json.dumps({'index': index, 'error': f'Invalid JSON: {e}'}), True))
+            continue
+        try:
+            result = {'index': index, **optimize_entry(entry, _analyzer, optimizers, with_analysis)}
+        except ValueError as e:
+            result = {'index': index, 'error': str(e)}
+        except Exception as e:
+            result = {'index': index, 'error': f'{type(e).__name__}: {e}'}
+        results.append((index, json.dumps(result, ensure_ascii=False), 'error' in result))
+    return results
+
+class JobRunner:
+    """
+    Processes queued jobs in the background of a web process.
+    At most concurrency jobs run at once across every process sharing the
+    job database, and each running job is processed one chunk at a time
+    by a single worker process started with a lower CPU priority, so jobs
+    never use more than concurrency cores and yield to interactive
+    requests. Progress is saved after every chunk under a lease that the
+    runner keeps renewing; if the process dies, the lease expires and
+    another runner resumes the job from its last saved chunk.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = 1, chunk_size: int = 100, nice: int = 10,
+                 lease: float = 60, poll_interval: float = 2, retention: float = 7 * 86400):
+        self.store = store
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.nice = nice
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pool = None
+        self._pid = None
+        self._last_purge = 0.0
+
+    def start(self):
+        """Start the runner threads in this process, if they are not running yet."""
+        with self._lock:
+            if self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads):
+                return
+            self._pid = os.getpid()
+            self._pool = None
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._run, name=f'q3-jobs-{i}', daemon=True)
+                             for i in range(self.concurrency)]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        """Check for queued jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5):
+        """Stop the runner threads; jobs they were running are queued again."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the web process has threads and open sockets
+                self._pool = ProcessPoolExecutor(max_workers=self.concurrency,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=init_job_worker, initargs=(self.nice,))
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    self.store.purge(time.time() - self.retention)
+                job = self.store.claim(self.concurrency, self.lease)
+                if job is None:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+                self._process(job)
+            except Exception:
+                logger.exception('Job runner error')
+                self._stop.wait(self.poll_interval)
+
+    def _process(self, job: Dict[str, Any]):
+        job_id, owner = job['id'], job['owner']
+        pool = self._get_pool()
+        while not self._stop.is_set():
+            items = self.store.pending_items(job_id, self.chunk_size)
+            if not items:
+                self.store.finish(job_id, owner, 'done')
+                return
+            try:
+                future = pool.submit(optimize_items, items, job['tools'], job['with_analysis'])
+                while True:
+                    try:
+                        results = future.result(timeout=self.lease / 3)
+                        break
+                    except FutureTimeoutError:
+                        if not self.store.renew(job_id, owner, self.lease):
+                            return
+            except Exception as e:
+                # A worker crashed (e.g. out of memory) or the pool was shut down
+                logger.exception('Job %s failed', job_id)
+                self._reset_pool(pool)
+                if self._stop.is_set():
+                    break
+                self.store.finish(job_id, owner, 'failed', f'{type(e).__name__}: {e}')
+                return
+            if not self.store.save_results(job_id, owner, results, self.lease):
+                return
+        self.store.release(job_id, owner)
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+import threading
+import time
+import uuid
+
+from optimizers.base_optimizer import BaseOptimizer
+from prompt_analyzer import PromptAnalyzer
+from text_diff import make_patch
+
+def count_occurrences(text: str, keyword: str) -> int:
+    """Count the occurrences of keyword in text, including overlapping ones."""
+    count, index = 0, text.find(keyword)
+    while index != -1:
+        count += 1
+        index = text.find(keyword, index + 1)
+    return count
+
+class LiveSession:
+    """
+    Prompt being edited in the web interface's live preview.
+    Keeps the current text and how often each analyzer keyword occurs in
+    it. An edit only rescans a keyword-sized window around the changed
+    range, so analysis costs the same however long the prompt is; the
+    optimized prompt is then rebuilt and sent back as a patch against the
+    previous one.
+    """
+
+    def __init__(self, analyzer: PromptAnalyzer, tool: str, text: str = ''):
+        self.analyzer = analyzer
+        self.tool = tool
+        self.text = text
+        self.version = 0
+        self.optimized = ''
+        self.analysis = None
+        self.explanation = None
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self._window = max(len(keyword) for keyword in analyzer.KEYWORDS) - 1
+        lowered = text.lower()
+        self.counts = {keyword: count_occurrences(lowered, keyword) for keyword in analyzer.KEYWORDS}
+
+    def size(self) -> int:
+        """Characters held by the session: the prompt and its optimized version."""
+        return len(self.text) + len(self.optimized)
+
+    def apply_edit(self, start: int, delete: int, insert: str):
+        """Replace text[start:start + delete] with insert and update the keyword counts."""
+        if start < 0 or delete < 0 or start + delete > len(self.text):
+            raise ValueError('Edit is outside the current prompt')
+        left = max(0, start - self._window)
+        old_window = self.text[left:start + delete + self._window].lower()
+        self.text = self.text[:start] + insert + self.text[start + delete:]
+        new_window = self.text[left:start + len(insert) + self._window].lower()
+        if old_window != new_window:
+            for keyword in self.counts:
+                self.counts[keyword] += count_occurrences(new_window, keyword) - count_occurrences(old_window, keyword)
+
+    def update(self, edits: List[Dict[str, Any]], optimizer: BaseOptimizer) -> Dict[str, Any]:
+        """
+        Apply a batch of edits, re-optimize and return only what changed:
+        a patch against the previous optimized prompt, plus the analysis and
+        explanation if they differ from the last ones sent.
+        """
+        for edit in edits:
+            self.apply_edit(int(edit.get('start', 0)), int(edit.get('delete', 0)), str(edit.get('insert', '')))
+        self.version += 1
+
+        found = {keyword for keyword, count in self.counts.items() if count}
+        analysis = self.analyzer.analyze_keywords(found, len(self.text))
+        optimization = optimizer.optimize(self.text, analysis)
+        optimized = optimization.prompt
+        analysis = analysis.to_dict()
+        explanation = optimization.get_explanation()
+        explanation = {field: explanation[field] for field in ('steps', 'summary', 'tokens')}
+
+        result = {'version': self.version, 'patch': make_patch(self.optimized, optimized)}
+        if analysis != self.analysis:
+            result['analysis'] = self.analysis = analysis
+        if explanation != self.explanation:
+            result['explanation'] = self.explanation = explanation
+        self.optimized = optimized
+        return result
+
+class LiveSessionStore:
+    """
+    Bounded set of live sessions, evicting the least recently used ones when
+    there are more than max_sessions or they hold more than max_chars
+    characters in total, and any that have been idle for longer than ttl
+    seconds.
+    """
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 600, max_chars: int = 32 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_chars = max_chars
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: LiveSession) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = session
+            self._trim(session_id)
+        return session_id
+
+    def fit(self, session_id: str):
+        """Evict other sessions if session_id grew the total past max_chars."""
+        with self._lock:
+            self._trim(session_id)
+
+    def get(self, session_id: str) -> Optional[LiveSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_used = time.monotonic()
+            return session
+
+    def remove(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _trim(self, keep: str):
+        total = sum(session.size() for session in self._sessions.values())
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions and total <= self.max_chars:
+                break
+            if session_id != keep:
+                total -= self._sessions.pop(session_id).size()
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= deadline:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -1,61 +1,385 @@
-from abc import ABC, abstractmethod
-from typing import Dict, Any
-
-class BaseOptimizer(ABC):
-    """
-    Base class for all tool-specific prompt optimizers.
-    Defines the interface that all optimizers must implement.
-    """
-    
-    def __init__(self):
-        self.explanation = []
-        self.optimization_steps = []
-    
-    @abstractmethod
-    def optimize(self, prompt: str, analysis: Dict[str, Any]) -> str:
-        """
-        Optimize a prompt for the specific tool.
-        
-        Args:
-            prompt: The original prompt to optimize
-            analysis: Analysis results from PromptAnalyzer
-            
-        Returns:
-            The optimized prompt
-        """
-        pass
-    
-    def get_explanation(self) -> Dict[str, Any]:
-        """
-        Get explanation of the optimizations made.
-        
-        Returns:
-            Dictionary containing optimization explanation
-        """
-        return {
-            'steps': self.optimization_steps,
-            'summary': self.explanation,
-            'tool_name': self.get_tool_name(),
-            'capabilities': self.get_capabilities()
-        }
-    
-    @abstractmethod
-    def get_tool_name(self) -> str:
-        """Get the name of the tool this optimizer is designed for."""
-        pass
-    
-    @abstractmethod
-    def get_capabilities(self) -> Dict[str, Any]:
-        """Get the capabilities and characteristics of the target tool."""
-        pass
-    
-    def add_explanation(self, step: str, reason: str):
-        """Add an explanation step for the optimization process."""
-        self.optimization_steps.append({
-            'step': step,
-            'reason': reason
-        })
-    
-    def add_summary(self, summary: str):
-        """Add a summary explanation."""
-        self.explanation.append(summary) 
\ No newline at end of file
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Union
+import contextvars
+import hashlib
+import inspect
+import sys
+import time
+
+Section = Union[str, List[str]]
+
+# Average characters per token of BPE tokenizers on English prose and code
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(chars: int) -> int:
+    """Estimate the tokens a model tokenizer splits a text of this many characters into."""
+    return -(-chars // CHARS_PER_TOKEN)
+
+class PromptDocument:
+    """
+    Builder for an optimized prompt.
+    Keeps the original prompt and the guidance sections prepended or
+    appended to it as separate segments, so each optimization step only
+    touches its own section instead of copying the whole prompt.
+    Segments are joined with a blank line when the document is rendered.
+    """
+
+    SEPARATOR = '\n\n'
+
+    def __init__(self, prompt: str):
+        self._head = []
+        self._body = [prompt]
+        self._tail = []
+        # (priority, insertion order) of each head and tail section
+        self._head_ranks = []
+        self._tail_ranks = []
+        self._lowered = {}
+        self._headers = set()
+        self._length = len(prompt)
+        self._index_headers(prompt)
+
+    def _index_headers(self, text: str):
+        """Record every '# Header:' prefix found at the start of a line."""
+        # Jump between lines starting with '#' instead of splitting the whole text
+        if text.startswith('#'):
+            self._index_line(text, 0)
+        newline = text.find('\n#')
+        while newline != -1:
+            self._index_line(text, newline + 1)
+            newline = text.find('\n#', newline + 1)
+
+    def _index_line(self, text: str, start: int):
+        end = text.find('\n', start)
+        line = text[start:] if end == -1 else text[start:end]
+        colon = line.find(':')
+        if colon != -1:
+            self._headers.add(line[:colon + 1])
+
+    def _segments(self) -> List[str]:
+        return self._head[::-1] + self._body + self._tail
+
+    def _lower(self, segment: str) -> str:
+        lowered = self._lowered.get(segment)
+        if lowered is None:
+            lowered = self._lowered[segment] = segment.lower()
+        return lowered
+
+    def prepend(self, section: Section, priority: int = 1):
+        """
+        Insert a section before everything currently in the document.
+        Sections with a lower priority are shortened first when the
+        document has to fit a token budget.
+        """
+        if isinstance(section, list):
+            section = '\n'.join(section)
+        self._head.append(section)
+        self._head_ranks.append((priority, len(self._head_ranks) + len(self._tail_ranks)))
+        self._length += len(section) + len(self.SEPARATOR)
+        self._index_headers(section)
+
+    def append(self, section: Section, priority: int = 1):
+        """Add a section after everything currently in the document (see prepend)."""
+        if isinstance(section, list):
+            section = '\n'.join(section)
+        self._tail.append(section)
+        self._tail_ranks.append((priority, len(self._head_ranks) + len(self._tail_ranks)))
+        self._length += len(section) + len(self.SEPARATOR)
+        self._index_headers(section)
+
+    def has_header(self, header: str) -> bool:
+        """
+        Check whether any line starts with the given marker.
+        Markers are matched up to their first colon, e.g. '# Project Structure:'.
+        """
+        return header in self._headers
+
+    def contains(self, *needles: str, ignore_case: bool = True, body_only: bool = False) -> bool:
+        """
+        Check whether any of the needles appears in the document.
+        With body_only=True only the prompt itself is searched, not the added sections.
+        """
+        segments = self._body if body_only else self._segments()
+        if ignore_case:
+            segments = [self._lower(segment) for segment in segments]
+        return any(needle in segment for needle in needles for segment in segments)
+
+    def startswith(self, prefix: str) -> bool:
+        """Check whether the rendered document starts with the given prefix."""
+        first = self._head[-1] if self._head else self._body[0]
+        return first.startswith(prefix)
+
+    def replace(self, replacements: Dict[str, str]):
+        """Apply literal replacements, in order, to every segment."""
+        changed = False
+        for segments in (self._head, self._body, self._tail):
+            for i, segment in enumerate(segments):
+                updated = segment
+                for old, new in replacements.items():
+                    updated = updated.replace(old, new)
+                if updated is not segment:
+                    segments[i] = updated
+                    changed = True
+        if changed:
+            self._reindex()
+
+    def _reindex(self):
+        """Recompute the cached headers and length after segments changed."""
+        self._lowered = {}
+        self._headers = set()
+        segments = self._segments()
+        self._length = sum(len(segment) for segment in segments) + len(self.SEPARATOR) * (len(segments) - 1)
+        for segment in segments:
+            self._index_headers(segment)
+
+    def fit_token_budget(self, budget: Optional[int]) -> Dict[str, Any]:
+        """
+        Shorten the added sections until the estimated token count fits the budget.
+        Sections are taken lowest priority first, and most recently added
+        first within a priority. Each is first compressed to its heading
+        line; if that is not enough, whole sections are dropped. The prompt
+        itself is never changed. Returns the token counts and what was cut.
+        """
+        length = original_length = len(self)
+        compressed, dropped = [], []
+        if budget is not None and estimate_tokens(length) > budget:
+            sections = [(rank, segments, ranks, i)
+                        for segments, ranks in ((self._head, self._head_ranks), (self._tail, self._tail_ranks))
+                        for i, rank in enumerate(ranks)]
+            sections.sort(key=lambda section: (section[0][0], -section[0][1]))
+            for _, segments, _, i in sections:
+                if estimate_tokens(length) <= budget:
+                    break
+                heading = segments[i].split('\n', 1)[0]
+                if heading != segments[i]:
+                    length -= len(segments[i]) - len(heading)
+                    segments[i] = heading
+                    compressed.append(heading)
+            for _, segments, ranks, i in sections:
+                if estimate_tokens(length) <= budget:
+                    break
+                heading = segments[i].split('\n', 1)[0]
+                if heading in compressed:
+                    compressed.remove(heading)
+                length -= len(segments[i]) + len(self.SEPARATOR)
+                dropped.append(heading)
+                segments[i] = ranks[i] = None
+            for segments, ranks in ((self._head, self._head_ranks), (self._tail, self._tail_ranks)):
+                segments[:] = [segment for segment in segments if segment is not None]
+                ranks[:] = [rank for rank in ranks if rank is not None]
+            self._reindex()
+        tokens = estimate_tokens(length)
+        return {
+            'budget': budget,
+            'prompt_tokens': estimate_tokens(self._body_length()),
+            'original_tokens': estimate_tokens(original_length),
+            'tokens': tokens,
+            'within_budget': budget is None or tokens <= budget,
+            'compressed': compressed,
+            'dropped': dropped
+        }
+
+    def _body_length(self) -> int:
+        return len(self._body[0])
+
+    def render(self) -> str:
+        """Materialize the document as a single string."""
+        return self.SEPARATOR.join(self._segments())
+
+    def __len__(self) -> int:
+        """Length of the rendered document, without rendering it."""
+        return self._length
+
+    def __str__(self) -> str:
+        return self.render()
+
+class Optimization:
+    """
+    One run of an optimizer over a prompt: the document it built plus the
+    steps, summaries, step timings and token counts recorded on the way.
+    Optimizers are shared by every request, so this per-call state lives
+    here rather than on the optimizer.
+    """
+
+    def __init__(self, optimizer: 'BaseOptimizer', document: PromptDocument):
+        self.optimizer = optimizer
+        self.document = document
+        self.explanation = []
+        self.optimization_steps = []
+        self.step_profiles = []
+        self.token_usage = {}
+        self._prompt = None
+        self._mark_ns = time.perf_counter_ns()
+        self._mark_length = len(document)
+
+    @property
+    def prompt(self) -> str:
+        """The optimized prompt, rendered on first use."""
+        if self._prompt is None:
+            self._prompt = self.document.render()
+        return self._prompt
+
+    def add_explanation(self, step: str, reason: str):
+        """
+        Add an explanation step for the optimization process.
+        Also records how long the step took since the previous one and how
+        many bytes it added (the guidance text is ASCII, so characters and
+        bytes coincide).
+        """
+        self.optimization_steps.append({
+            'step': step,
+            'reason': reason
+        })
+        now, length = time.perf_counter_ns(), len(self.document)
+        self.step_profiles.append({
+            'step': step,
+            'duration_ns': now - self._mark_ns,
+            'bytes_added': length - self._mark_length
+        })
+        self._mark_ns, self._mark_length = now, length
+
+    def add_summary(self, summary: str):
+        """Add a summary explanation."""
+        self.explanation.append(summary)
+
+    def get_explanation(self) -> Dict[str, Any]:
+        """
+        Get explanation of the optimizations made.
+        
+        Returns:
+            Dictionary containing optimization explanation
+        """
+        return {
+            'steps': self.optimization_steps,
+            'summary': self.explanation,
+            'tool_name': self.optimizer.get_tool_name(),
+            'capabilities': self.optimizer.capabilities(),
+            'tokens': self.token_usage
+        }
+
+    def get_profile(self) -> List[Dict[str, Any]]:
+        """Get the per-step timings of this optimization."""
+        return list(self.step_profiles)
+
+# The optimization the current thread is running; the rules record their steps in it
+_current_optimization = contextvars.ContextVar('current_optimization', default=None)
+
+class BaseOptimizer(ABC):
+    """
+    Base class for all tool-specific prompt optimizers.
+    Defines the interface that all optimizers must implement.
+    One instance serves every request, so optimizers keep no per-call
+    state: optimize() returns it in an Optimization.
+    """
+    
+    # Estimated tokens the optimized prompt may use in the target tool (None for no limit)
+    TOKEN_BUDGET = None
+    # Analysis features the rules read; PromptAnalyzer evaluates only these (None for all)
+    FEATURES = None
+    
+    def optimize(self, prompt: str, analysis: Dict[str, Any]) -> Optimization:
+        """
+        Optimize a prompt for the specific tool.
+        
+        Args:
+            prompt: The original prompt to optimize
+            analysis: Analysis results from PromptAnalyzer
+            
+        Returns:
+            The Optimization, with the optimized prompt and its explanation
+        """
+        return self.optimize_document(PromptDocument(prompt), analysis)
+    
+    def optimize_document(self, document: PromptDocument, analysis: Dict[str, Any]) -> Optimization:
+        """
+        Optimize an existing document in place, without rendering it.
+        Used when the prompt is not held in memory as a single string.
+        """
+        optimization = Optimization(self, document)
+        token = _current_optimization.set(optimization)
+        try:
+            self.apply_rules(document, analysis)
+            self.fit_token_budget(document)
+        finally:
+            _current_optimization.reset(token)
+        return optimization
+    
+    @abstractmethod
+    def apply_rules(self, document: PromptDocument, analysis: Dict[str, Any]):
+        """
+        Apply the tool-specific optimization rules to a document.
+        
+        Args:
+            document: The prompt being optimized; rules add sections to it
+            analysis: Analysis results from PromptAnalyzer
+        """
+        pass
+    
+    def fit_token_budget(self, document: PromptDocument):
+        """
+        Keep the optimized prompt within TOKEN_BUDGET by shortening the
+        lowest-priority sections, and record the token counts.
+        """
+        usage = document.fit_token_budget(self.TOKEN_BUDGET)
+        shortened = len(usage['compressed']) + len(usage['dropped'])
+        if shortened:
+            self.add_explanation(
+                "Fitted to token budget",
+                f"Shortened {shortened} lower-priority sections to stay within the ~{self.TOKEN_BUDGET} token budget for {self.get_tool_name()}"
+            )
+        self.current_optimization().token_usage = usage
+    
+    def current_optimization(self) -> Optimization:
+        """The optimization in progress in this thread; only valid while the rules run."""
+        optimization = _current_optimization.get()
+        if optimization is None or optimization.optimizer is not self:
+            raise RuntimeError(f"{type(self).__name__} is not optimizing a prompt in this thread")
+        return optimization
+    
+    @property
+    def optimization_steps(self) -> List[Dict[str, str]]:
+        """Steps recorded so far by the optimization in progress."""
+        return self.current_optimization().optimization_steps
+    
+    @property
+    def explanation(self) -> List[str]:
+        """Summaries recorded so far by the optimization in progress."""
+        return self.current_optimization().explanation
+    
+    def capabilities(self) -> Dict[str, Any]:
+        """get_capabilities(), built once per optimizer since it never changes."""
+        capabilities = getattr(self, '_capabilities', None)
+        if capabilities is None:
+            capabilities = self._capabilities = self.get_capabilities()
+        return capabilities
+    
+    @abstractmethod
+    def get_tool_name(self) -> str:
+        """Get the name of the tool this optimizer is designed for."""
+        pass
+    
+    @abstractmethod
+    def get_capabilities(self) -> Dict[str, Any]:
+        """Get the capabilities and characteristics of the target tool."""
+        pass
+    
+    def get_rules_version(self) -> str:
+        """
+        Get a fingerprint of the optimization rules.
+        Derived from the source of this optimizer and the base module,
+        so it changes whenever the rules are edited.
+        """
+        version = getattr(self, '_rules_version', None)
+        if version is None:
+            digest = hashlib.sha256()
+            for module_name in (BaseOptimizer.__module__, type(self).__module__):
+                digest.update(inspect.getsource(sys.modules[module_name]).encode('utf-8'))
+            version = self._rules_version = digest.hexdigest()[:16]
+        return version
+    
+    def add_explanation(self, step: str, reason: str):
+        """Add an explanation step to the optimization in progress (see Optimization.add_explanation)."""
+        self.current_optimization().add_explanation(step, reason)
+    
+    def add_summary(self, summary: str):
+        """Add a summary explanation to the optimization in progress."""
+        self.current_optimization().add_summary(summary)
@@ -0,0 +1,101 @@
+from typing import Dict, Any, List, Optional
+import importlib
+import json
+import os
+import threading
+
+from .base_optimizer import BaseOptimizer
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manifest.json')
+
+class OptimizerRegistry:
+    """
+    Registry of tool optimizers described by JSON manifests.
+    Each manifest entry gives the tool id, its display metadata and the
+    optimizer class as 'module:ClassName'. Metadata is available without
+    importing anything; an optimizer's module is imported and the class
+    instantiated only the first time that tool is requested (or when the
+    production server preloads it).
+
+    Packaging entry points would be just as lazy, since reading them with
+    importlib.metadata imports nothing, but they are only declared by
+    installed distributions. q3 runs from a source checkout, so manifests
+    let optimizers, including ones outside the repository, be added by
+    editing JSON instead of packaging them.
+    """
+
+    METADATA_FIELDS = ('id', 'name', 'description', 'icon')
+
+    def __init__(self):
+        self._entries = {}
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_manifests(cls, paths: Optional[List[str]] = None) -> 'OptimizerRegistry':
+        """
+        Build a registry from the built-in manifest plus any extra manifests.
+        Extra manifests default to the Q3_OPTIMIZER_MANIFESTS environment
+        variable (paths separated by os.pathsep); later entries override
+        earlier ones with the same id.
+        """
+        if paths is None:
+            extra = os.environ.get('Q3_OPTIMIZER_MANIFESTS', '')
+            paths = [path for path in extra.split(os.pathsep) if path]
+        registry = cls()
+        for path in [MANIFEST_PATH] + list(paths):
+            registry.load_manifest(path)
+        return registry
+
+    def load_manifest(self, path: str):
+        """Register every entry of a manifest file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                self.register(entry)
+
+    def register(self, entry: Dict[str, Any]):
+        """Register a single manifest entry without importing its optimizer."""
+        missing = [field for field in self.METADATA_FIELDS + ('class',) if field not in entry]
+        if missing:
+            raise ValueError(f"Optimizer manifest entry {entry.get('id', entry)!r} is missing {', '.join(missing)}")
+        with self._lock:
+            self._entries[entry['id']] = dict(entry)
+            self._instances.pop(entry['id'], None)
+
+    def __contains__(self, tool_id: str) -> bool:
+        return tool_id in self._entries
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def __getitem__(self, tool_id: str) -> BaseOptimizer:
+        return self.get(tool_id)
+
+    def ids(self) -> List[str]:
+        """Get the ids of all registered tools, in registration order."""
+        return list(self._entries)
+
+    def loaded(self) -> List[str]:
+        """Get the ids of the optimizers that have been instantiated so far."""
+        return list(self._instances)
+
+    def metadata(self) -> List[Dict[str, Any]]:
+        """Get the display metadata of every tool, as served by /tools."""
+        return [{field: entry[field] for field in self.METADATA_FIELDS} for entry in self._entries.values()]
+
+    def get(self, tool_id: str) -> BaseOptimizer:
+        """Get the optimizer for a tool, importing and constructing it on first use."""
+        optimizer = self._instances.get(tool_id)
+        if optimizer is None:
+            with self._lock:
+                optimizer = self._instances.get(tool_id)
+                if optimizer is None:
+                    module_name, class_name = self._entries[tool_id]['class'].split(':')
+                    optimizer_class = getattr(importlib.import_module(module_name), class_name)
+                    optimizer = self._instances[tool_id] = optimizer_class()
+        return optimizer
+
+    def load_all(self):
+        """Instantiate every registered optimizer, e.g. before forking workers."""
+        for tool_id in self.ids():
+            self.get(tool_id)
\ No newline at end of file
@@ -0,0 +1,33 @@
+from typing import Callable, Any
+import gzip
+import hashlib
+
+class PrecomputedResponse:
+    """
+    JSON response that is serialized and gzip-compressed once, up front.
+    Serves the stored bytes with a strong ETag per encoding and a long
+    Cache-Control lifetime, and answers If-None-Match with 304 so clients
+    revalidate instead of re-downloading.
+    """
+
+    def __init__(self, payload: Any, dumps: Callable[[Any], str], max_age: int = 86400):
+        self.body = (dumps(payload) + '\n').encode('utf-8')
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.gzip_etag = self.etag + '-gzip'
+        self.max_age = max_age
+
+    def to_response(self, request, response_class):
+        """Build the response for a request, honouring Accept-Encoding and If-None-Match."""
+        use_gzip = 'gzip' in request.accept_encodings
+        etag = self.gzip_etag if use_gzip else self.etag
+        if request.if_none_match.contains(self.etag) or request.if_none_match.contains(self.gzip_etag):
+            response = response_class(status=304)
+        else:
+            response = response_class(self.gzipped if use_gzip else self.body, mimetype='application/json')
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
\ No newline at end of file
@@ -0,0 +1,144 @@
+from typing import Dict, Any, List, Optional
+import bisect
+import os
+import sqlite3
+import threading
+
+# Upper bounds of the latency buckets, in nanoseconds (1 us to 1 s)
+BUCKET_BOUNDS_NS = [
+    1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000,
+    1_000_000, 2_500_000, 5_000_000, 10_000_000, 25_000_000, 50_000_000,
+    100_000_000, 250_000_000, 500_000_000, 1_000_000_000
+]
+
+class Histogram:
+    """Fixed-bucket latency histogram with running totals."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.bytes_added = 0
+
+    def observe(self, duration_ns: int, bytes_added: int = 0):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_NS, duration_ns)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.bytes_added += bytes_added
+
+    def quantile(self, q: float) -> int:
+        """
+        Upper bound of the bucket containing the q-th quantile, capped at the
+        largest observation so that it never reports more than was seen.
+        """
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for i, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return min(BUCKET_BOUNDS_NS[i], self.max_ns) if i < len(BUCKET_BOUNDS_NS) else self.max_ns
+        return self.max_ns
+
+    def to_dict(self) -> Dict[str, Any]:
+        bounds = [str(bound) for bound in BUCKET_BOUNDS_NS] + ['+Inf']
+        return {
+            'count': self.count,
+            'total_ns': self.total_ns,
+            'mean_ns': self.total_ns // self.count if self.count else 0,
+            'max_ns': self.max_ns,
+            'p50_ns': self.quantile(0.50),
+            'p95_ns': self.quantile(0.95),
+            'p99_ns': self.quantile(0.99),
+            'bytes_added': self.bytes_added,
+            'buckets': {bound: count for bound, count in zip(bounds, self.buckets) if count}
+        }
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS histograms (
+    name TEXT PRIMARY KEY, count INTEGER, total_ns INTEGER, max_ns INTEGER, bytes_added INTEGER
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT, bucket INTEGER, count INTEGER, PRIMARY KEY (name, bucket)
+);
+"""
+
+class ProfileMetrics:
+    """
+    Aggregate timings of profiled /optimize requests.
+    Keeps one histogram for the analyzer, one per tool for the whole
+    optimize call and one per (tool, rule) pair. Without db_path the
+    histograms live in this process's memory; with it they are counters in
+    a SQLite database that every worker process adds to, so a snapshot
+    covers all of them whichever worker serves it. Each process opens its
+    own connection on first use.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or None
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork (e.g. gunicorn's preload), so reconnect per process
+        if self._db is None or self._pid != os.getpid():
+            db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def observe(self, name: str, duration_ns: int, bytes_added: int = 0):
+        self.observe_many([(name, duration_ns, bytes_added)])
+
+    def observe_many(self, observations: List[tuple]):
+        """Add (name, duration_ns, bytes_added) observations, in one transaction when shared."""
+        with self._lock:
+            if self.db_path is None:
+                for name, duration_ns, bytes_added in observations:
+                    histogram = self._histograms.get(name)
+                    if histogram is None:
+                        histogram = self._histograms[name] = Histogram()
+                    histogram.observe(duration_ns, bytes_added)
+                return
+            db = self._connection()
+            with db:
+                for name, duration_ns, bytes_added in observations:
+                    db.execute('INSERT INTO histograms VALUES (?, 1, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET '
+                               'count = count + 1, total_ns = total_ns + excluded.total_ns, '
+                               'max_ns = max(max_ns, excluded.max_ns), bytes_added = bytes_added + excluded.bytes_added',
+                               (name, duration_ns, duration_ns, bytes_added))
+                    db.execute('INSERT INTO buckets VALUES (?, ?, 1) ON CONFLICT (name, bucket) DO UPDATE SET '
+                               'count = count + 1', (name, bisect.bisect_left(BUCKET_BOUNDS_NS, duration_ns)))
+
+    def record(self, tool: str, analyzer_ns: int, optimize_ns: int, steps: List[Dict[str, Any]]):
+        """Feed the timings of one profiled request."""
+        self.observe_many([('analyzer', analyzer_ns, 0), (f'{tool}/optimize', optimize_ns, 0)] +
+                          [(f"{tool}/{step['step']}", step['duration_ns'], step['bytes_added']) for step in steps])
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.db_path is None:
+                return {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())}
+            db = self._connection()
+            histograms = {}
+            for name, count, total_ns, max_ns, bytes_added in db.execute('SELECT * FROM histograms'):
+                histogram = histograms[name] = Histogram()
+                histogram.count, histogram.total_ns, histogram.max_ns = count, total_ns, max_ns
+                histogram.bytes_added = bytes_added
+            for name, bucket, count in db.execute('SELECT * FROM buckets'):
+                if name in histograms:
+                    histograms[name].buckets[bucket] = count
+        return {name: histogram.to_dict() for name, histogram in sorted(histograms.items())}
+
+    def close(self):
+        """Close this process's connection to the shared database, if any."""
+        with self._lock:
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
\ No newline at end of file
@@ -1,45 +1,271 @@
-from typing import Dict
-import re
-
-class PromptAnalyzer:
-    """
-    Analyzes a prompt for intent, complexity, requirements, and other features.
-    """
-    def analyze_prompt(self, prompt: str) -> Dict:
-        analysis = {}
-        prompt_lower = prompt.lower()
-        # Intent
-        if any(word in prompt_lower for word in ['function', 'method', 'def ']):
-            analysis['intent'] = 'function_generation'
-        elif any(word in prompt_lower for word in ['project', 'app', 'create', 'build']):
-            analysis['intent'] = 'project_creation'
-        elif 'review' in prompt_lower or 'refactor' in prompt_lower:
-            analysis['intent'] = 'code_review'
-        elif 'web' in prompt_lower or 'website' in prompt_lower:
-            analysis['intent'] = 'web_development'
-        elif 'cloud' in prompt_lower or 'aws' in prompt_lower:
-            analysis['intent'] = 'cloud_development'
-        elif 'infrastructure' in prompt_lower:
-            analysis['intent'] = 'infrastructure'
-        else:
-            analysis['intent'] = 'general'
-        # Complexity
-        if len(prompt) > 300 or any(word in prompt_lower for word in ['complex', 'algorithm', 'architecture', 'system']):
-            analysis['complexity'] = 'high'
-        elif len(prompt) > 120 or any(word in prompt_lower for word in ['test', 'documentation', 'multiple', 'several']):
-            analysis['complexity'] = 'medium'
-        else:
-            analysis['complexity'] = 'low'
-        # Requirements
-        analysis['has_context'] = any(word in prompt_lower for word in ['context', 'background', 'requirement'])
-        analysis['has_examples'] = 'example' in prompt_lower
-        analysis['has_testing'] = 'test' in prompt_lower
-        analysis['has_documentation'] = 'documentation' in prompt_lower or 'readme' in prompt_lower
-        analysis['has_dependencies'] = 'requirement' in prompt_lower or 'dependency' in prompt_lower or 'package' in prompt_lower
-        analysis['has_aws_context'] = 'aws' in prompt_lower or 'cloudformation' in prompt_lower or 'lambda' in prompt_lower
-        analysis['has_security'] = 'security' in prompt_lower or 'iam' in prompt_lower
-        analysis['has_io_format'] = 'input:' in prompt_lower and 'output:' in prompt_lower
-        analysis['has_requirements'] = 'requirement' in prompt_lower or 'constraint' in prompt_lower
-        analysis['asks_for_explanation'] = 'explain' in prompt_lower or 'why' in prompt_lower
-        analysis['asks_for_reasoning'] = 'reason' in prompt_lower or 'explain' in prompt_lower
-        return analysis 
\ No newline at end of file
+from collections.abc import Mapping
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Set
+import hashlib
+import inspect
+import re
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_MISSING = object()
+
+class KeywordScanner:
+    """
+    Case-insensitive keyword search over a stream of text chunks.
+    Keeps the last len(longest keyword) - 1 characters of each chunk so
+    keywords split across a chunk boundary are still found.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.remaining = set(keywords)
+        self.found = set()
+        self._window = max((len(keyword) for keyword in self.remaining), default=1) - 1
+        self._carry = ''
+
+    def feed(self, chunk: str):
+        text = self._carry + chunk.lower()
+        hits = {keyword for keyword in self.remaining if keyword in text}
+        self.found |= hits
+        self.remaining -= hits
+        self._carry = text[-self._window:] if self._window else ''
+
+class LazyAnalysis(Mapping):
+    """
+    Prompt analysis whose features are computed on first access and memoized.
+    Reads like the dict analyze_prompt used to return; dict(analysis) or
+    to_dict() materializes every feature, e.g. for a JSON response.
+    """
+    def __init__(self, analyzer: 'PromptAnalyzer', length: int, prompt: Optional[str] = None, keywords: Optional[Set[str]] = None):
+        self._analyzer = analyzer
+        self._length = length
+        self._prompt = prompt
+        # Lowercased prompt, or the set of KEYWORDS found in it
+        self._text = keywords
+        self._features = {}
+    def __getitem__(self, name: str) -> Any:
+        value = self._features.get(name, _MISSING)
+        if value is _MISSING:
+            if name not in self._analyzer.FEATURES:
+                raise KeyError(name)
+            if self._text is None:
+                self._text = self._prompt.lower()
+            value = self._features[name] = getattr(self._analyzer, '_' + name)(self._text, self._length)
+        return value
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._analyzer.FEATURES)
+    def __len__(self) -> int:
+        return len(self._analyzer.FEATURES)
+    def computed(self) -> List[str]:
+        """Names of the features evaluated so far."""
+        return list(self._features)
+    def to_dict(self, features: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Materialize the given features (all of them by default) as a plain dict."""
+        return {name: self[name] for name in (self._analyzer.FEATURES if features is None else features)}
+    def __repr__(self) -> str:
+        return f'LazyAnalysis({self._features!r})'
+
+class PromptAnalyzer:
+    """
+    Analyzes a prompt for intent, complexity, requirements, and other features.
+    Features are evaluated lazily: optimizers declare the ones they read
+    (BaseOptimizer.FEATURES) and only those are computed unless the whole
+    analysis is materialized.
+    """
+    # Every keyword the rules below look for, so prompts can be scanned in chunks
+    KEYWORDS = (
+        'function', 'method', 'def ', 'project', 'app', 'create', 'build', 'review', 'refactor',
+        'web', 'website', 'cloud', 'aws', 'infrastructure', 'complex', 'algorithm', 'architecture',
+        'system', 'test', 'documentation', 'multiple', 'several', 'context', 'background',
+        'requirement', 'example', 'readme', 'dependency', 'package', 'cloudformation', 'lambda',
+        'security', 'iam', 'input:', 'output:', 'constraint', 'explain', 'why', 'reason'
+    )
+    # Every feature, in the order of a materialized analysis; each is computed by the method '_' + name
+    FEATURES = (
+        'intent', 'complexity', 'has_context', 'has_examples', 'has_testing', 'has_documentation',
+        'has_dependencies', 'has_aws_context', 'has_security', 'has_io_format', 'has_requirements',
+        'asks_for_explanation', 'asks_for_reasoning'
+    )
+    # Prompt lengths above which complexity is at least medium / high. Rules see
+    # the length only through these thresholds, which analyze_many relies on.
+    MEDIUM_LENGTH = 120
+    HIGH_LENGTH = 300
+    # Longer prompts are analyzed one by one in analyze_many: past this length
+    # the rules' short-circuiting searches beat a full scan for every keyword
+    BATCH_PROMPT_LENGTH = 1024
+    def analyze_prompt(self, prompt: str) -> LazyAnalysis:
+        return LazyAnalysis(self, len(prompt), prompt=prompt)
+    def analyze_chunks(self, chunks: Iterable[str]) -> LazyAnalysis:
+        """
+        Analyze a prompt supplied as a sequence of text chunks.
+        Only a keyword-sized window of the previous chunk is kept, so memory
+        does not grow with the prompt; the result equals analyze_prompt on
+        the joined text.
+        """
+        scanner = KeywordScanner(self.KEYWORDS)
+        length = 0
+        for chunk in chunks:
+            scanner.feed(chunk)
+            length += len(chunk)
+        return LazyAnalysis(self, length, keywords=scanner.found)
+    def analyze_keywords(self, found: Iterable[str], length: int) -> LazyAnalysis:
+        """Analyze a prompt known only by which KEYWORDS it contains and its length."""
+        return LazyAnalysis(self, length, keywords=set(found))
+    def analyze_many(self, prompts: Iterable[str], features: Optional[Iterable[str]] = None,
+                     batch_size: int = 10000) -> Dict[str, List[Any]]:
+        """
+        Analyze a batch of prompts and return the analysis by column:
+        {feature: [value for each prompt]}, for the given features (all of
+        them by default) in FEATURES order. Every value equals
+        analyze_prompt(prompt)[feature].
+
+        Duplicate prompts are analyzed once. With NumPy installed, prompts
+        up to BATCH_PROMPT_LENGTH characters are scanned for KEYWORDS
+        together, into a prompt x keyword matrix, and the rules run once per
+        distinct combination of keywords found and length class rather than
+        once per prompt; without it, each prompt is analyzed on its own.
+        prompts may be any iterable; it is consumed batch_size prompts at a
+        time to bound memory.
+        """
+        selected = set(self.FEATURES if features is None else features)
+        names = [name for name in self.FEATURES if name in selected]
+        columns = {name: [] for name in names}
+        rows = {}
+        prompts = iter(prompts)
+        while True:
+            batch = list(islice(prompts, batch_size))
+            if not batch:
+                return columns
+            for name, values in zip(names, zip(*self._analyze_batch(batch, names, rows))):
+                columns[name].extend(values)
+    def _analyze_batch(self, prompts: List[str], names: List[str], rows: Dict[int, tuple]) -> List[tuple]:
+        """
+        Feature rows for a batch of prompts. rows caches the row of each
+        (keyword mask, length class) signature across batches.
+        """
+        by_prompt = {}
+        short = []
+        for prompt in dict.fromkeys(prompts):
+            if np is None or len(prompt) > self.BATCH_PROMPT_LENGTH:
+                analysis = self.analyze_prompt(prompt)
+                by_prompt[prompt] = tuple(analysis[name] for name in names)
+            else:
+                short.append(prompt)
+        if short:
+            matrix = self._keyword_matrix(short)
+            lengths = np.fromiter(map(len, short), np.int64, len(short))
+            # Bit i for KEYWORDS[i], then the length class in the two bits above them
+            signatures = matrix @ (1 << np.arange(len(self.KEYWORDS), dtype=np.int64))
+            signatures |= ((lengths > self.MEDIUM_LENGTH).astype(np.int64) + (lengths > self.HIGH_LENGTH)) << len(self.KEYWORDS)
+            _, first, inverse = np.unique(signatures, return_index=True, return_inverse=True)
+            rules = [getattr(self, '_' + name) for name in names]
+            table = []
+            for signature, hits, length in zip(signatures[first].tolist(), matrix[first].tolist(), lengths[first].tolist()):
+                row = rows.get(signature)
+                if row is None:
+                    found = {keyword for keyword, hit in zip(self.KEYWORDS, hits) if hit}
+                    row = rows[signature] = tuple(rule(found, length) for rule in rules)
+                table.append(row)
+            by_prompt.update(zip(short, map(table.__getitem__, inverse.tolist())))
+        return [by_prompt[prompt] for prompt in prompts]
+    def _keyword_matrix(self, prompts: List[str]) -> 'np.ndarray':
+        """
+        Boolean matrix with a row per prompt and a column per KEYWORDS entry,
+        true where the lowercased prompt contains the keyword. The prompts
+        are searched as one NUL-joined UTF-8 string (the keywords are ASCII,
+        so byte and character matches agree): one table lookup over every
+        2-byte window finds the positions where some keyword could start,
+        and each keyword's remaining bytes are compared at those only.
+        """
+        joined = '\0'.join(prompts)
+        if joined.isascii():
+            data = joined.lower().encode('ascii')
+            sizes = np.fromiter(map(len, prompts), np.int64, len(prompts))
+        else:
+            encoded = [prompt.lower().encode('utf-8') for prompt in prompts]
+            data = b'\0'.join(encoded)
+            sizes = np.fromiter(map(len, encoded), np.int64, len(encoded))
+        # Offset just past each prompt's separator, to map a position to its prompt
+        ends = np.cumsum(sizes + 1)
+        keywords = [keyword.encode('ascii') for keyword in self.KEYWORDS]
+        # Group number (from 1) of every 2-byte window that begins a keyword, as a little-endian uint16
+        prefixes = sorted({keyword[0] | keyword[1] << 8 for keyword in keywords})
+        groups = np.zeros(1 << 16, np.uint8)
+        groups[prefixes] = np.arange(1, len(prefixes) + 1)
+        size = len(data)
+        # Padding so that comparing a keyword's bytes never reads past the end
+        data += b'\0' * max(map(len, keywords))
+        candidates, candidate_groups = [], []
+        for offset in (0, 1):
+            windows = groups[np.frombuffer(data, '<u2', count=(size - offset) // 2, offset=offset)]
+            positions = np.flatnonzero(windows)
+            candidates.append(positions * 2 + offset)
+            candidate_groups.append(windows[positions])
+        candidates, candidate_groups = np.concatenate(candidates), np.concatenate(candidate_groups)
+        order = np.argsort(candidate_groups, kind='stable')
+        candidates = candidates[order]
+        bounds = np.searchsorted(candidate_groups[order], np.arange(len(prefixes) + 2))
+        buffer = np.frombuffer(data, np.uint8)
+        matrix = np.zeros((len(prompts), len(keywords)), bool)
+        for column, keyword in enumerate(keywords):
+            group = prefixes.index(keyword[0] | keyword[1] << 8) + 1
+            positions = candidates[bounds[group]:bounds[group + 1]]
+            for i in range(2, len(keyword)):
+                positions = positions[buffer[positions + i] == keyword[i]]
+            matrix[np.searchsorted(ends, positions, side='right'), column] = True
+        return matrix
+    # Feature rules; prompt_lower is the lowercased prompt, or the set of KEYWORDS found in it
+    def _intent(self, prompt_lower, length: int) -> str:
+        if any(word in prompt_lower for word in ['function', 'method', 'def ']):
+            return 'function_generation'
+        elif any(word in prompt_lower for word in ['project', 'app', 'create', 'build']):
+            return 'project_creation'
+        elif 'review' in prompt_lower or 'refactor' in prompt_lower:
+            return 'code_review'
+        elif 'web' in prompt_lower or 'website' in prompt_lower:
+            return 'web_development'
+        elif 'cloud' in prompt_lower or 'aws' in prompt_lower:
+            return 'cloud_development'
+        elif 'infrastructure' in prompt_lower:
+            return 'infrastructure'
+        else:
+            return 'general'
+    def _complexity(self, prompt_lower, length: int) -> str:
+        if length > self.HIGH_LENGTH or any(word in prompt_lower for word in ['complex', 'algorithm', 'architecture', 'system']):
+            return 'high'
+        elif length > self.MEDIUM_LENGTH or any(word in prompt_lower for word in ['test', 'documentation', 'multiple', 'several']):
+            return 'medium'
+        else:
+            return 'low'
+    def _has_context(self, prompt_lower, length: int) -> bool:
+        return any(word in prompt_lower for word in ['context', 'background', 'requirement'])
+    def _has_examples(self, prompt_lower, length: int) -> bool:
+        return 'example' in prompt_lower
+    def _has_testing(self, prompt_lower, length: int) -> bool:
+        return 'test' in prompt_lower
+    def _has_documentation(self, prompt_lower, length: int) -> bool:
+        return 'documentation' in prompt_lower or 'readme' in prompt_lower
+    def _has_dependencies(self, prompt_lower, length: int) -> bool:
+        return 'requirement' in prompt_lower or 'dependency' in prompt_lower or 'package' in prompt_lower
+    def _has_aws_context(self, prompt_lower, length: int) -> bool:
+        return 'aws' in prompt_lower or 'cloudformation' in prompt_lower or 'lambda' in prompt_lower
+    def _has_security(self, prompt_lower, length: int) -> bool:
+        return 'security' in prompt_lower or 'iam' in prompt_lower
+    def _has_io_format(self, prompt_lower, length: int) -> bool:
+        return 'input:' in prompt_lower and 'output:' in prompt_lower
+    def _has_requirements(self, prompt_lower, length: int) -> bool:
+        return 'requirement' in prompt_lower or 'constraint' in prompt_lower
+    def _asks_for_explanation(self, prompt_lower, length: int) -> bool:
+        return 'explain' in prompt_lower or 'why' in prompt_lower
+    def _asks_for_reasoning(self, prompt_lower, length: int) -> bool:
+        return 'reason' in prompt_lower or 'explain' in prompt_lower
+    def get_rules_version(self) -> str:
+        """Fingerprint of the analysis rules, derived from this module's source."""
+        version = getattr(self, '_rules_version', None)
+        if version is None:
+            source = inspect.getsource(sys.modules[type(self).__module__])
+            version = self._rules_version = hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+        return version
\ No newline at end of file
@@ -0,0 +1,161 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+from text_diff import make_patch
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson when it is installed and
+    falls back to the standard library otherwise, for values orjson cannot
+    encode, or when ensure_ascii=True is passed explicitly (e.g. for
+    headers). Keys are sorted either way, so both produce the same
+    documents; orjson output is compact and not ASCII-escaped.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.encode(obj, **kwargs).decode('utf-8')
+
+    def encode(self, obj: Any, **kwargs: Any) -> bytes:
+        """Serialize obj straight to UTF-8 bytes, without an intermediate str when using orjson."""
+        if orjson is not None and not kwargs.get('ensure_ascii'):
+            option = orjson.OPT_SORT_KEYS if kwargs.get('sort_keys', self.sort_keys) else 0
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except TypeError:
+                # orjson.JSONEncodeError: e.g. non-str keys or integers beyond 64 bits
+                pass
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+def make_diff(original: str, optimized: str) -> List[Dict[str, Any]]:
+    """
+    Edits turning original into optimized, as {start, delete, insert}
+    dicts with positions in the original, sorted and non-overlapping, so
+    they can be applied last to first. Optimizers add sections around the
+    prompt, so this is usually one insertion before it and one after; if
+    the prompt text itself was rewritten the changed span is replaced.
+    """
+    # Find the prompt by a short prefix and confirm the whole of it, which is
+    # far faster than searching for a megabyte-long needle
+    probe = original[:64]
+    index = optimized.find(probe)
+    while index != -1 and not optimized.startswith(original, index):
+        index = optimized.find(probe, index + 1)
+    if index == -1:
+        patch = make_patch(original, optimized)
+        return [patch] if patch else []
+    edits = []
+    if index:
+        edits.append({'start': 0, 'delete': 0, 'insert': optimized[:index]})
+    end = index + len(original)
+    if end < len(optimized):
+        edits.append({'start': len(original), 'delete': 0, 'insert': optimized[end:]})
+    return edits
+
+def _select(value: Any, paths: List[Tuple[str, ...]]) -> Any:
+    """Keep the parts of value named by paths; an empty path keeps everything below it."""
+    if any(not path for path in paths):
+        return value
+    if isinstance(value, list):
+        return [_select(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    selected = {}
+    for key, item in value.items():
+        below = [path[1:] for path in paths if path[0] == key]
+        if below:
+            selected[key] = _select(item, below)
+    return selected
+
+class ResponseFormat:
+    """
+    Shape of an /optimize response requested by the client.
+    fields selects top-level fields or dotted paths below them, e.g.
+    "optimized_prompt,explanation.steps"; format "diff" returns
+    optimized_diff instead of optimized_prompt and omits the echoed
+    original_prompt; capabilities "ref" replaces explanation.capabilities
+    with capabilities_url, the path of the tool's static capabilities.
+    """
+
+    FIELDS = ('original_prompt', 'optimized_prompt', 'optimized_diff', 'analysis', 'explanation', 'tool')
+    FORMATS = ('full', 'diff')
+    CAPABILITIES = ('inline', 'ref')
+
+    def __init__(self, fields: Optional[Iterable[str]] = None, prompt_format: str = 'full', capabilities: str = 'inline'):
+        if prompt_format not in self.FORMATS:
+            raise ValueError('format must be "full" or "diff"')
+        if capabilities not in self.CAPABILITIES:
+            raise ValueError('capabilities must be "inline" or "ref"')
+        self.prompt_format = prompt_format
+        self.capabilities = capabilities
+        self.fields = None if fields is None else sorted(set(fields))
+        if self.fields is None:
+            omitted = ('original_prompt', 'optimized_prompt') if prompt_format == 'diff' else ('optimized_diff',)
+            fields = [field for field in self.FIELDS if field not in omitted]
+        self._paths = {}
+        for field in fields:
+            path = tuple(part for part in field.split('.') if part)
+            if not path or path[0] not in self.FIELDS:
+                raise ValueError(f"Unknown response field: {field!r}")
+            self._paths.setdefault(path[0], []).append(path[1:])
+
+    @classmethod
+    def from_request(cls, data: Dict[str, Any]) -> 'ResponseFormat':
+        """Read the fields, format and capabilities options of an /optimize request body."""
+        fields = data.get('fields')
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        elif fields is not None and not (isinstance(fields, list) and all(isinstance(field, str) for field in fields)):
+            raise ValueError('fields must be a list or a comma-separated string of field names')
+        return cls(fields, data.get('format', 'full'), data.get('capabilities', 'inline'))
+
+    @property
+    def key(self) -> str:
+        """Distinguishes cached responses of this shape; empty for the default shape."""
+        if self.fields is None and self.prompt_format == 'full' and self.capabilities == 'inline':
+            return ''
+        return f":{self.prompt_format}:{self.capabilities}:{','.join(self.fields or ())}"
+
+    def wants(self, field: str) -> bool:
+        return field in self._paths
+
+    def subfields(self, field: str) -> Optional[List[str]]:
+        """Names selected directly below a top-level field, or None if it is selected whole."""
+        paths = self._paths.get(field, [])
+        if any(not path for path in paths):
+            return None
+        return [path[0] for path in paths]
+
+    def build(self, original_prompt: str, optimized_prompt: str, analysis: Mapping[str, Any],
+              explanation: Dict[str, Any], tool: str, features: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Assemble the selected parts of a response. Only the selected
+        analysis features (limited to features, if given) are read, so a
+        LazyAnalysis computes nothing more.
+        """
+        response = {}
+        if self.wants('original_prompt'):
+            response['original_prompt'] = original_prompt
+        if self.wants('optimized_prompt'):
+            response['optimized_prompt'] = optimized_prompt
+        if self.wants('optimized_diff'):
+            response['optimized_diff'] = make_diff(original_prompt, optimized_prompt)
+        if self.wants('analysis'):
+            selected = self.subfields('analysis')
+            names = analysis if features is None else features
+            response['analysis'] = {name: analysis[name] for name in names if selected is None or name in selected}
+        if self.wants('explanation'):
+            if self.capabilities == 'ref':
+                explanation = {key: value for key, value in explanation.items() if key != 'capabilities'}
+                explanation['capabilities_url'] = f'/tools/{tool}/capabilities'
+            response['explanation'] = explanation
+        if self.wants('tool'):
+            response['tool'] = tool
+        return {field: _select(value, self._paths[field]) for field, value in response.items()}
@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+
+class ResultCache:
+    """
+    Content-addressed cache for serialized /optimize responses.
+    Entries are keyed by a digest of (prompt, tool, rules version) and hold
+    the exact response bytes, so a hit skips analysis, optimization and
+    JSON encoding. A bounded in-memory LRU sits in front of an optional
+    SQLite tier that survives restarts. The SQLite database may be shared
+    by several processes; each thread opens its own connection on first
+    use, and queries run outside the LRU's lock so that no request waits
+    on another's disk I/O.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.db_path = db_path or None
+        self._local = threading.local()
+        # Every connection this process opened, so close() can close them all
+        self._connections = []
+        self._pid = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # One connection per thread, so transactions never interleave; connections
+        # must not cross a fork (e.g. gunicorn's preload), so reconnect per process
+        if self.db_path is None:
+            return None
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, rules_version TEXT, body BLOB)')
+            db.commit()
+            self._local.db, self._local.pid = db, os.getpid()
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._connections, self._pid = [], os.getpid()
+                self._connections.append(db)
+        return db
+
+    @staticmethod
+    def make_key(prompt: str, tool: str, rules_version: str) -> str:
+        """Build the content address for a prompt/tool pair under a given rule set."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f'{prompt_hash}:{tool}:{rules_version}'.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, count: bool = True) -> Optional[bytes]:
+        """
+        Return the cached response body for a key, or None on a miss.
+        With count=False the lookup is left out of the hit/miss counters,
+        e.g. when re-checking a key that was just counted as a miss.
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += count
+                return body
+        db = self._connection()
+        row = None
+        if db is not None:
+            row = db.execute('SELECT body FROM results WHERE key = ?', (key,)).fetchone()
+        with self._lock:
+            if row is not None:
+                body = bytes(row[0])
+                self._store(key, body)
+                self.hits += count
+                self.disk_hits += count
+                return body
+            self.misses += count
+            return None
+
+    def put(self, key: str, body: bytes, rules_version: str = ''):
+        """Store a response body under a key."""
+        with self._lock:
+            self._store(key, body)
+        db = self._connection()
+        if db is not None:
+            db.execute('INSERT OR REPLACE INTO results (key, rules_version, body) VALUES (?, ?, ?)',
+                       (key, rules_version, body))
+            db.commit()
+
+    def _store(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = body
+        self._size += len(body)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def purge_stale(self, rules_version: str, scope: str = ''):
+        """
+        Drop on-disk entries written under superseded rule sets.
+        Only rows whose rules version starts with scope are considered, so
+        each tool can purge its own entries when its version is computed.
+        """
+        db = self._connection()
+        if db is None:
+            return
+        db.execute('DELETE FROM results WHERE substr(rules_version, 1, ?) = ? AND rules_version != ?',
+                   (len(scope), scope, rules_version))
+        db.commit()
+
+    def close(self):
+        """Close this process's connections to the SQLite tier, if any."""
+        with self._lock:
+            if self._pid == os.getpid():
+                for db in self._connections:
+                    db.close()
+            self._connections = []
+            self._local = threading.local()
+
+    def clear(self):
+        """Remove every entry from the in-memory tier."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'disk_tier': self.db_path is not None
+            }
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+
+class CoalescedCallTimeout(TimeoutError):
+    """Raised in a follower that gave up waiting for the leader's result."""
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single computation.
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running (followers) wait for the leader and receive
+    the same result, or the same exception. Nothing is kept once the leader
+    finishes, so this complements a cache rather than replacing one.
+    """
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run func for key, or wait for the call already running for key.
+        Returns (result, shared) where shared is True for followers. A
+        follower waits at most timeout seconds and then raises
+        CoalescedCallTimeout; the leader itself is never interrupted.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.followers += 1
+                self.followers += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result, False
+
+        if not call.done.wait(self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise CoalescedCallTimeout(f'Timed out after {self.timeout}s waiting for an identical request')
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'timeout_seconds': self.timeout
+            }
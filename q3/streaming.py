@@ -0,0 +1,165 @@
+from typing import Dict, IO, Iterator, List
+import codecs
+
+from optimizers.base_optimizer import PromptDocument
+# Lives with the analyzer, which uses it; kept importable from here
+from prompt_analyzer import KeywordScanner
+
+class LiteralReplacer:
+    """
+    Streaming equivalent of str.replace(old, new).
+    Replaces non-overlapping matches left to right and holds back a tail
+    shorter than old that could be the start of a match in the next chunk.
+    """
+
+    def __init__(self, old: str, new: str):
+        self.old = old
+        self.new = new
+        self._carry = ''
+
+    def feed(self, text: str, final: bool = False) -> str:
+        buffer = self._carry + text
+        if final:
+            self._carry = ''
+            return buffer.replace(self.old, self.new)
+        parts, position = [], 0
+        while True:
+            index = buffer.find(self.old, position)
+            if index == -1:
+                break
+            parts.append(buffer[position:index])
+            parts.append(self.new)
+            position = index + len(self.old)
+        keep_from = max(position, len(buffer) - len(self.old) + 1)
+        parts.append(buffer[position:keep_from])
+        self._carry = buffer[keep_from:]
+        return ''.join(parts)
+
+class SpooledPromptDocument(PromptDocument):
+    """
+    PromptDocument whose prompt lives in a UTF-8 file instead of memory.
+    Added sections are kept in memory as usual. Searches over the prompt
+    and the replacements applied to it are streamed through the file one
+    chunk at a time, so memory stays proportional to the chunk size.
+    """
+
+    def __init__(self, spool: IO[bytes], length: int, chunk_size: int = 64 * 1024):
+        super().__init__('')
+        self._spool = spool
+        self._chunk_size = chunk_size
+        self._prompt_length = length
+        self._replacements = []
+        self._found = {}
+
+    def iter_body(self) -> Iterator[str]:
+        """Yield the prompt in chunks, with all replacements applied."""
+        self._spool.seek(0)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        stages = [LiteralReplacer(old, new) for replacements in self._replacements for old, new in replacements.items()]
+        while True:
+            data = self._spool.read(self._chunk_size)
+            final = not data
+            text = decoder.decode(data, final)
+            for stage in stages:
+                text = stage.feed(text, final)
+            if text:
+                yield text
+            if final:
+                return
+
+    def iter_render(self) -> Iterator[str]:
+        """Yield the rendered document in chunks."""
+        for section in reversed(self._head):
+            yield section
+            yield self.SEPARATOR
+        yield from self.iter_body()
+        for section in self._tail:
+            yield self.SEPARATOR
+            yield section
+
+    def render(self) -> str:
+        return ''.join(self.iter_render())
+
+    def _body_contains(self, needles: List[str], ignore_case: bool) -> bool:
+        key = (tuple(needles), ignore_case, len(self._replacements))
+        if key not in self._found:
+            window = max(len(needle) for needle in needles) - 1
+            carry, found = '', False
+            for chunk in self.iter_body():
+                text = carry + (chunk.lower() if ignore_case else chunk)
+                if any(needle in text for needle in needles):
+                    found = True
+                    break
+                carry = text[-window:] if window else ''
+            self._found[key] = found
+        return self._found[key]
+
+    def contains(self, *needles: str, ignore_case: bool = True, body_only: bool = False) -> bool:
+        if not body_only:
+            sections = self._head + self._tail
+            if ignore_case:
+                sections = [self._lower(section) for section in sections]
+            if any(needle in section for needle in needles for section in sections):
+                return True
+        return self._body_contains(list(needles), ignore_case)
+
+    def has_header(self, header: str) -> bool:
+        if header in self._headers:
+            return True
+        return self._body_starts_with(header) or self._body_contains(['\n' + header], ignore_case=False)
+
+    def _body_starts_with(self, prefix: str) -> bool:
+        start = ''
+        for chunk in self.iter_body():
+            start += chunk
+            if len(start) >= len(prefix):
+                break
+        return start.startswith(prefix)
+
+    def startswith(self, prefix: str) -> bool:
+        if self._head:
+            return self._head[-1].startswith(prefix)
+        return self._body_starts_with(prefix)
+
+    def replace(self, replacements: Dict[str, str]):
+        self._replacements.append(dict(replacements))
+        for segments in (self._head, self._tail):
+            for i, segment in enumerate(segments):
+                for old, new in replacements.items():
+                    segment = segment.replace(old, new)
+                segments[i] = segment
+        self._reindex()
+        self._prompt_length = None
+
+    def _body_length(self) -> int:
+        if self._prompt_length is None:
+            self._prompt_length = sum(len(chunk) for chunk in self.iter_body())
+        return self._prompt_length
+
+    def __len__(self) -> int:
+        sections = self._head + self._tail
+        return self._body_length() + sum(len(section) + len(self.SEPARATOR) for section in sections)
+
+class BodyTooLargeError(ValueError):
+    """Raised when a streamed request body exceeds its size limit."""
+
+def spool_text(source: IO[bytes], spool: IO[bytes], max_bytes: int, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Copy a UTF-8 byte stream into spool, yielding it as decoded text chunks.
+    Raises BodyTooLargeError once more than max_bytes have been read and
+    UnicodeDecodeError if the bytes are not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    total = 0
+    while True:
+        data = source.read(chunk_size)
+        final = not data
+        total += len(data)
+        if total > max_bytes:
+            raise BodyTooLargeError(f'Prompt exceeds the {max_bytes} byte limit')
+        spool.write(data)
+        text = decoder.decode(data, final)
+        if text:
+            yield text
+        if final:
+            return
@@ -0,0 +1,6 @@
+"""Shared setup for the q3 tests. Run from q3 with: python -m pytest tests"""
+import os
+import sys
+
+Q3_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Q3_DIR)
@@ -0,0 +1,23 @@
+"""Latency histogram quantiles."""
+from profile_metrics import BUCKET_BOUNDS_NS, Histogram
+
+def test_quantiles_never_exceed_the_max():
+    histogram = Histogram()
+    for duration_ns in (1_200, 1_300, 1_400, 30_000):
+        histogram.observe(duration_ns)
+    stats = histogram.to_dict()
+    assert stats['p50_ns'] <= stats['p95_ns'] <= stats['p99_ns'] <= stats['max_ns'] == 30_000
+    assert stats['p50_ns'] == BUCKET_BOUNDS_NS[1]
+
+def test_quantile_of_a_single_observation_is_that_observation():
+    histogram = Histogram()
+    histogram.observe(3_000)
+    assert histogram.quantile(0.5) == histogram.quantile(0.99) == 3_000
+
+def test_quantile_past_the_last_bucket():
+    histogram = Histogram()
+    histogram.observe(2_000_000_000)
+    assert histogram.quantile(0.5) == 2_000_000_000
+
+def test_empty_histogram():
+    assert Histogram().quantile(0.95) == 0
@@ -0,0 +1,53 @@
+"""Batch analysis against the per-prompt analyzer."""
+import json
+import os
+
+import pytest
+
+import prompt_analyzer
+from prompt_analyzer import PromptAnalyzer
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus.json')
+
+def corpus_prompts():
+    with open(CORPUS_PATH, 'r', encoding='utf-8') as f:
+        return [entry['prompt'] for entry in json.load(f)['prompts']]
+
+# Keywords across separators, in other casing, next to non-ASCII text whose
+# lowercase form changes length, around NULs, and on either side of the
+# length thresholds and BATCH_PROMPT_LENGTH
+EDGE_CASES = [
+    '', 'ap', 'p', 'AP', 'PLE', 'def', 'def x', 'DEF  x', 'WebSite', 'web', 'site',
+    'İnput: a Output: b', 'ΣΑΣ test', 'Straße explain', 'bac\u212aground and iam',
+    'lamb\0da', 'a\0lambda', 'reason\0', '\0', 'x' * 120, 'x' * 121, 'x' * 300, 'x' * 301,
+    'build ' * 300, 'aws ' + 'y' * PromptAnalyzer.BATCH_PROMPT_LENGTH,
+]
+
+def expected(analyzer, prompts, features=None):
+    names = [name for name in analyzer.FEATURES if features is None or name in features]
+    return {name: [analyzer.analyze_prompt(prompt)[name] for prompt in prompts] for name in names}
+
+@pytest.fixture(params=['numpy', 'fallback'])
+def analyzer(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(prompt_analyzer, 'np', None)
+    return PromptAnalyzer()
+
+def test_analyze_many_matches_analyze_prompt(analyzer):
+    prompts = corpus_prompts() + EDGE_CASES
+    assert analyzer.analyze_many(prompts) == expected(analyzer, prompts)
+
+def test_every_keyword_in_every_length_class(analyzer):
+    prompts = [f'{keyword.upper()} {filler}' for keyword in analyzer.KEYWORDS for filler in ('', 'z' * 150, 'z' * 400)]
+    prompts += [' '.join(analyzer.KEYWORDS[i::5]) for i in range(5)]
+    assert analyzer.analyze_many(prompts) == expected(analyzer, prompts)
+
+def test_duplicates_features_and_batches(analyzer):
+    prompts = corpus_prompts() * 3 + EDGE_CASES
+    features = ['complexity', 'intent']
+    assert analyzer.analyze_many(iter(prompts), features=features, batch_size=7) == expected(analyzer, prompts, features)
+
+def test_empty_batch(analyzer):
+    assert analyzer.analyze_many([]) == {name: [] for name in analyzer.FEATURES}
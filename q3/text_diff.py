@@ -0,0 +1,40 @@
+from typing import Dict, Any, Optional
+
+# Block size used when scanning for the common prefix and suffix of two texts
+SCAN_BLOCK = 16 * 1024
+
+def common_prefix_length(old: str, new: str, reverse: bool = False) -> int:
+    """
+    Length of the longest common prefix (or suffix, with reverse=True) of
+    old and new. Compares whole blocks first and only binary-searches
+    inside the first block that differs, so the cost is a few memcmp-speed
+    slice comparisons per block.
+    """
+    limit = min(len(old), len(new))
+
+    def same(start: int, end: int) -> bool:
+        if reverse:
+            return old[len(old) - end:len(old) - start] == new[len(new) - end:len(new) - start]
+        return old[start:end] == new[start:end]
+
+    start = 0
+    while start < limit and same(start, min(start + SCAN_BLOCK, limit)):
+        start += SCAN_BLOCK
+    if start >= limit:
+        return limit
+    low, high = start, min(start + SCAN_BLOCK, limit) - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if same(start, middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def make_patch(old: str, new: str) -> Optional[Dict[str, Any]]:
+    """Single replacement turning old into new, or None if they are equal."""
+    if old == new:
+        return None
+    prefix = common_prefix_length(old, new)
+    suffix = common_prefix_length(old[prefix:], new[prefix:], reverse=True)
+    return {'start': prefix, 'delete': len(old) - prefix - suffix, 'insert': new[prefix:len(new) - suffix]}
@@ -0,0 +1,85 @@
+from bisect import bisect_left
+from typing import Any, Dict, List
+import math
+import re
+
+# Words, keeping names like "c++", "c#" and "node.js" in one piece
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[+#]+|(?:\.[a-z0-9]+)+)?')
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class ToolSearchIndex:
+    """
+    Inverted index over the descriptive fields of tool_analysis.json, built
+    once when the data is loaded. Each list entry (or documentation link)
+    is indexed word by word; a search scores every tool by the entries that
+    match the query words, weighted by field and by how rare the word is
+    across tools (BM25 idf), and returns the matching entries rather than
+    the whole tool description. Query words of MIN_PREFIX or more
+    characters also match longer words starting with them, at
+    PREFIX_WEIGHT of an exact match.
+    """
+
+    # Fields indexed, with the weight of an entry matching in each
+    FIELDS = {'best_for': 3.0, 'strengths': 2.0, 'limitations': 1.0, 'documentation': 0.5}
+    MIN_PREFIX = 2
+    PREFIX_WEIGHT = 0.5
+
+    def __init__(self, tool_analysis: Dict[str, Dict[str, Any]]):
+        self._order = {tool: i for i, tool in enumerate(tool_analysis)}
+        self._names = {tool: details.get('name', tool) for tool, details in tool_analysis.items()}
+        # (tool, field, text) of every indexed entry
+        self._entries = []
+        postings = {}
+        for tool, details in tool_analysis.items():
+            for field in self.FIELDS:
+                value = details.get(field) or []
+                # documentation maps link names to URLs; index both
+                items = [f'{name} {url}' for name, url in value.items()] if isinstance(value, dict) else value
+                for text in items:
+                    entry = len(self._entries)
+                    self._entries.append((tool, field, text))
+                    for word in set(tokenize(text)):
+                        postings.setdefault(word, []).append(entry)
+        self._postings = {word: tuple(entries) for word, entries in postings.items()}
+        self._vocabulary = sorted(self._postings)
+
+    def _matches(self, word: str) -> Dict[int, float]:
+        """Entries matching one query word, with the weight of the best match in each."""
+        matches = dict.fromkeys(self._postings.get(word, ()), 1.0)
+        if len(word) >= self.MIN_PREFIX:
+            i = bisect_left(self._vocabulary, word)
+            while i < len(self._vocabulary) and self._vocabulary[i].startswith(word):
+                for entry in self._postings[self._vocabulary[i]]:
+                    matches.setdefault(entry, self.PREFIX_WEIGHT)
+                i += 1
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Tools matching any word of query, best first, as
+        {tool, name, score, matches: [{field, text}]}. Ties keep the order
+        of tool_analysis.json.
+        """
+        scores = {}
+        matched = {}
+        for word in dict.fromkeys(tokenize(query)):
+            matches = self._matches(word)
+            if not matches:
+                continue
+            tools = {self._entries[entry][0] for entry in matches}
+            idf = math.log(1 + (len(self._order) - len(tools) + 0.5) / (len(tools) + 0.5))
+            for entry, weight in matches.items():
+                tool, field, _ = self._entries[entry]
+                scores[tool] = scores.get(tool, 0.0) + idf * weight * self.FIELDS[field]
+                matched.setdefault(tool, set()).add(entry)
+        ranked = sorted(scores, key=lambda tool: (-scores[tool], self._order[tool]))[:limit]
+        return [{
+            'tool': tool,
+            'name': self._names[tool],
+            'score': round(scores[tool], 4),
+            'matches': [{'field': self._entries[entry][1], 'text': self._entries[entry][2]}
+                        for entry in sorted(matched[tool])]
+        } for tool in ranked]
+